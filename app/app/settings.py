@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",  # Custom app for core functionality
     "rest_framework",  # Django REST framework for API development
     "rest_framework.authtoken",  # Token authentication for DRF
@@ -55,6 +56,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestHarakiriMiddleware",
+    "core.middleware.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,9 +86,17 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "app.wsgi.application"
 
+# "wsgi" serves with uwsgi, "asgi" with uvicorn, see scripts/run.sh.
+RUN_MODE = os.environ.get("RUN_MODE", "wsgi")
+
+# Serve recipe, tag and ingredient reads with async views, see
+# recipe.async_views.
+ASYNC_API = RUN_MODE == "asgi"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# The postgresql backend runs on psycopg 3, the only driver installed.
 
 DATABASES = {
     "default": {
@@ -95,8 +106,51 @@ DATABASES = {
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
         "PORT": "5432",
+        # Keep connections open between requests and check them before
+        # reuse; 0 closes the connection at the end of every request.
+        # ASGI requests run on changing threads, so the default there is 0.
+        "CONN_MAX_AGE": int(os.environ.get(
+            "DB_CONN_MAX_AGE", 0 if RUN_MODE == "asgi" else 60
+        )),
+        "CONN_HEALTH_CHECKS": bool(
+            int(os.environ.get("DB_CONN_HEALTH_CHECKS", 1))
+        ),
+    }
+}
+
+# Threads per uwsgi worker, see scripts/run.sh.
+UWSGI_THREADS = int(os.environ.get("UWSGI_THREADS") or 1)
+
+# Per-process connection pool, sized to serve every worker thread, or
+# DB_POOL_MAX_SIZE concurrent requests under ASGI. It uses the psycopg
+# pool extra and replaces persistent connections; pooled connections
+# are checked before use when CONN_HEALTH_CHECKS is on.
+if bool(int(os.environ.get("DB_POOL", 0))):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": 1,
+            "max_size": int(os.environ.get(
+                "DB_POOL_MAX_SIZE", 10 if RUN_MODE == "asgi" else UWSGI_THREADS
+            )),
+            "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        },
     }
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
 }
+if os.environ.get("REDIS_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
 
 
 # Password validation
@@ -151,8 +205,66 @@ REST_FRAMEWORK = {
     #     "rest_framework.authentication.TokenAuthentication",
     # ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson-backed JSON; views can still set renderer_classes and
+    # parser_classes to the stock DRF classes.
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
+
+# Cached token authentication (core.authentication). The shared cache is
+# used when configured, as docker-compose-deploy.yaml does with REDIS_URL;
+# the per-process LOCAL cache is only safe with a single worker process,
+# as other workers would miss invalidations.
+TOKEN_AUTH_CACHE = {
+    "TTL": int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 60)),
+    "MAX_ENTRIES": int(os.environ.get("TOKEN_AUTH_CACHE_MAX_ENTRIES", 1024)),
+    "SHARED_CACHE": os.environ.get("TOKEN_AUTH_CACHE_SHARED") or (
+        "shared" if "shared" in CACHES else None
+    ),
+    "LOCAL": bool(int(os.environ.get("TOKEN_AUTH_CACHE_LOCAL", 0))),
+}
+
+# Per-user list response cache (recipe.cache). It needs a cache shared by
+# all workers and the image worker, so it stays disabled unless REDIS_URL
+# is configured; docker-compose-deploy.yaml sets it for both.
+RESPONSE_CACHE = {
+    "ALIAS": "shared" if "shared" in CACHES else None,
+    "TTL": int(os.environ.get("RESPONSE_CACHE_TTL", 300)),
+}
+
+# Per-request timings (core.middleware). Requests running more queries
+# or more milliseconds of them than these budgets are logged as warnings;
+# set REQUEST_LOG_LEVEL=INFO to log every request.
+REQUEST_QUERY_BUDGET = int(os.environ.get("REQUEST_QUERY_BUDGET", 30))
+REQUEST_DB_TIME_BUDGET = float(os.environ.get("REQUEST_DB_TIME_BUDGET", 200))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.middleware": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+        "core.images": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
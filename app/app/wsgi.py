@@ -7,10 +7,19 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# uwsgi imports this module once in the master and forks the workers
+# from it. Import the views now and keep everything loaded out of the
+# garbage collector, so workers share those pages instead of copying
+# them when the collector touches the objects.
+get_resolver().url_patterns
+gc.freeze()
@@ -44,3 +44,5 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
+admin.site.register(models.ImageJob)
+admin.site.register(models.ImportCheckpoint)
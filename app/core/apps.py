@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+
+        from core.authentication import (
+            invalidate_token_on_delete,
+            invalidate_user_tokens,
+        )
+
+        post_delete.connect(invalidate_token_on_delete, sender=Token)
+        post_save.connect(
+            invalidate_user_tokens, sender=settings.AUTH_USER_MODEL
+        )
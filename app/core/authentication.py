@@ -0,0 +1,152 @@
+"""
+Authentication backends for the API.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+DEFAULTS = {
+    "TTL": 60,
+    "MAX_ENTRIES": 1024,
+    "SHARED_CACHE": None,
+    "LOCAL": False,
+}
+
+
+def get_setting(name):
+    """Return a TOKEN_AUTH_CACHE setting, falling back to the default."""
+    return getattr(settings, "TOKEN_AUTH_CACHE", {}).get(name, DEFAULTS[name])
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry expiry."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, max_entries):
+        """Store a value, evicting the least recently used entries."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a value if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all values."""
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache()
+
+
+def _shared_cache_key(key):
+    return f"auth-token:{key}"
+
+
+def get_entry(key):
+    """Return the cached (user id, is_active) pair of a token, if any."""
+    alias = get_setting("SHARED_CACHE")
+    if alias:
+        return caches[alias].get(_shared_cache_key(key))
+    if get_setting("LOCAL"):
+        return local_cache.get(key)
+    return None
+
+
+def set_entry(key, entry):
+    """Cache the (user id, is_active) pair of a token."""
+    alias = get_setting("SHARED_CACHE")
+    if alias:
+        caches[alias].set(_shared_cache_key(key), entry, get_setting("TTL"))
+    elif get_setting("LOCAL"):
+        local_cache.set(
+            key, entry, get_setting("TTL"), get_setting("MAX_ENTRIES")
+        )
+
+
+def invalidate_token(key):
+    """Drop a cached token from the local and shared caches."""
+    local_cache.delete(key)
+    alias = get_setting("SHARED_CACHE")
+    if alias:
+        caches[alias].delete(_shared_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the user id behind each token.
+
+    Only the user id and is_active are cached. With a SHARED_CACHE alias
+    in TOKEN_AUTH_CACHE the shared cache is the only cache, so deleting
+    a token or saving its user takes effect in every worker at once.
+    Without one, a per-process LRU cache is used only when LOCAL is set,
+    which is safe only when the API runs in a single process.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return the (user, token) pair, hitting the database on miss."""
+        entry = get_entry(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            set_entry(key, (user.pk, user.is_active))
+            return (user, token)
+
+        user_id, is_active = entry
+        if not is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        # Other fields are deferred and loaded from the database if used.
+        user_model = get_user_model()
+        user = user_model.from_db(
+            user_model.objects.db,
+            [user_model._meta.pk.attname, "is_active"],
+            [user_id, is_active],
+        )
+        token = Token.from_db(
+            Token.objects.db, ["key", "user_id"], [key, user_id]
+        )
+        token.user = user
+        return (user, token)
+
+
+def invalidate_token_on_delete(sender, instance, **kwargs):
+    """Signal receiver dropping a deleted or replaced token."""
+    key = instance.key
+    # After the commit, so no request caches the row again meanwhile.
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Signal receiver dropping the tokens of a saved user."""
+    keys = list(
+        Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
+    transaction.on_commit(lambda: [invalidate_token(key) for key in keys])
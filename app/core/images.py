@@ -0,0 +1,194 @@
+"""
+Downscaled renditions of uploaded recipe images and their job queue.
+"""
+
+import logging
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import ImageJob, Recipe
+from recipe.cache import bump_generation
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each rendition.
+RENDITION_SIZES = {
+    "small": 320,
+    "medium": 960,
+}
+
+RENDITION_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def rendition_path(image_name, size_name, ext):
+    """Return the storage path of a rendition next to the original."""
+    root = os.path.splitext(image_name)[0]
+    return f"{root}_{size_name}.{ext}"
+
+
+def delete_renditions(renditions, keep=()):
+    """Remove rendition files from storage, except the paths in keep."""
+    for formats in (renditions or {}).values():
+        for path in formats.values():
+            if path not in keep:
+                default_storage.delete(path)
+
+
+def create_renditions(recipe):
+    """Render the recipe image at every size and store the paths.
+
+    The previous files are removed once the new paths are committed, so
+    a failed render leaves the stored renditions intact.
+    """
+    previous = recipe.image_renditions
+    renditions = {}
+    try:
+        if recipe.image:
+            with recipe.image.open("rb") as image_file:
+                image = ImageOps.exif_transpose(Image.open(image_file))
+                image = image.convert("RGB")
+
+            for size_name, size in RENDITION_SIZES.items():
+                resized = image.copy()
+                resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+                renditions[size_name] = {}
+                for ext, (fmt, options) in RENDITION_FORMATS.items():
+                    buffer = BytesIO()
+                    resized.save(buffer, fmt, **options)
+                    path = default_storage.save(
+                        rendition_path(recipe.image.name, size_name, ext),
+                        ContentFile(buffer.getvalue()),
+                    )
+                    renditions[size_name][ext] = path
+
+        recipe.image_renditions = renditions
+        recipe.save(update_fields=["image_renditions"])
+    except Exception:
+        recipe.image_renditions = previous
+        delete_renditions(renditions)
+        raise
+
+    kept = {path for formats in renditions.values()
+            for path in formats.values()}
+    transaction.on_commit(lambda: delete_renditions(previous, keep=kept))
+    return renditions
+
+
+def enqueue_renditions(recipe):
+    """Mark the recipe image pending and queue a job unless one waits."""
+    recipe.image_status = Recipe.ImageStatus.PENDING
+    recipe.save(update_fields=["image_status"])
+    pending = recipe.image_jobs.filter(status=ImageJob.Status.PENDING)
+    if not pending.exists():
+        ImageJob.objects.create(recipe=recipe)
+
+
+def claim_jobs(limit, stale_after, max_attempts=3):
+    """Lock and return up to limit runnable jobs.
+
+    Jobs left running longer than stale_after seconds belong to a worker
+    that died and are picked up again, unless they already used
+    max_attempts: an image that kills the worker fails its recipe instead.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        stale = ImageJob.objects.filter(
+            status=ImageJob.Status.RUNNING,
+            locked_at__lt=now - timedelta(seconds=stale_after),
+        )
+        exhausted = stale.filter(attempts__gte=max_attempts)
+        failed = list(exhausted.values_list("recipe_id", "recipe__user_id"))
+        if failed:
+            logger.warning(
+                "Failing image jobs of recipes %s: worker stopped %s times",
+                [recipe_id for recipe_id, _ in failed], max_attempts,
+            )
+            Recipe.objects.filter(
+                id__in=[recipe_id for recipe_id, _ in failed]
+            ).update(image_status=Recipe.ImageStatus.FAILED)
+            exhausted.update(
+                status=ImageJob.Status.FAILED,
+                last_error="Worker stopped while processing the job.",
+            )
+            for user_id in {user_id for _, user_id in failed}:
+                transaction.on_commit(
+                    lambda user_id=user_id: bump_generation(user_id)
+                )
+        stale.update(status=ImageJob.Status.PENDING)
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImageJob.Status.PENDING, run_after__lte=now)
+            .select_related("recipe")
+            .order_by("run_after", "id")[:limit]
+        )
+        for job in jobs:
+            job.status = ImageJob.Status.RUNNING
+            job.attempts += 1
+            job.locked_at = now
+        ImageJob.objects.bulk_update(
+            jobs, ["status", "attempts", "locked_at"]
+        )
+    return jobs
+
+
+def _drop_deleted_recipe_job(job):
+    """Remove a job whose recipe was deleted; return True if it was."""
+    if Recipe.objects.filter(pk=job.recipe_id).exists():
+        return False
+    logger.info(
+        "Dropping image job %s: recipe %s was deleted",
+        job.pk, job.recipe_id,
+    )
+    ImageJob.objects.filter(pk=job.pk).delete()
+    job.last_error = "Recipe was deleted."
+    return True
+
+
+def run_job(job, max_attempts):
+    """Render the job's recipe image, retrying with backoff on failure.
+
+    Returns True when the recipe image is ready. Jobs of recipes deleted
+    while queued or running are dropped.
+    """
+    recipe = job.recipe
+    try:
+        recipe.refresh_from_db()
+        create_renditions(recipe)
+    except Exception as exc:
+        if _drop_deleted_recipe_job(job):
+            return False
+        job.last_error = repr(exc)
+        if job.attempts < max_attempts:
+            job.status = ImageJob.Status.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=2 ** job.attempts
+            )
+        else:
+            job.status = ImageJob.Status.FAILED
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_status=Recipe.ImageStatus.FAILED
+            )
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=job.status,
+            run_after=job.run_after,
+            last_error=job.last_error,
+        )
+        return False
+
+    job.delete()
+    # A newer upload queued while this job ran will set the status itself.
+    if not recipe.image_jobs.filter(status=ImageJob.Status.PENDING).exists():
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_status=Recipe.ImageStatus.READY
+        )
+    return True
@@ -0,0 +1,348 @@
+"""
+Django command to load test the API in process.
+Seeds users with recipes, tags and ingredients, then sends concurrent
+requests to each endpoint through Django's test client, timing them
+and counting the queries they run. Seeded data is deleted afterwards.
+"""
+
+import argparse
+import functools
+import io
+import itertools
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import refresh_list_payloads
+
+PASSWORD = "benchmark-pass-123"
+
+
+def seed(options, rng, fixtures):
+    """Create the benchmark users, appending a fixture for each.
+
+    Fixtures are appended as soon as their user exists, so cleanup
+    covers what was created if seeding fails part way.
+    """
+    run = uuid.uuid4().hex[:8]
+    for n in range(options["users"]):
+        user = get_user_model().objects.create_user(
+            f"benchmark-{run}-{n}@example.com", PASSWORD
+        )
+        fixture = {"email": user.email, "uploads": []}
+        fixtures.append(fixture)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=f"Recipe {i}",
+                time_minutes=rng.randint(5, 120),
+                price=Decimal(rng.randint(100, 5000)) / 100,
+                link=f"https://example.com/recipes/{i}",
+                description="Benchmark recipe " * 10,
+            )
+            for i in range(options["recipes"])
+        )
+        fixture["token"] = Token.objects.create(user=user).key
+        fixture["recipes"] = [recipe.id for recipe in recipes]
+        for model, field_name in ((Tag, "tags"), (Ingredient, "ingredients")):
+            items = model.objects.bulk_create(
+                model(user=user, name=f"{field_name} {i}")
+                for i in range(options[field_name])
+            )
+            fixture[field_name] = [item.id for item in items]
+            through = getattr(Recipe, field_name).through
+            through.objects.bulk_create(
+                through(**{
+                    "recipe_id": recipe.id,
+                    f"{model._meta.model_name}_id": item.id,
+                })
+                for recipe in recipes
+                for item in rng.sample(
+                    items, min(options["related"], len(items))
+                )
+            )
+        refresh_list_payloads(fixture["recipes"])
+
+
+def cleanup(fixtures):
+    """Delete the benchmark users, their data and uploaded images."""
+    media_path = "/" + settings.MEDIA_URL.lstrip("/")
+    for fixture in fixtures:
+        for url in fixture["uploads"]:
+            default_storage.delete(
+                urlsplit(url).path.removeprefix(media_path)
+            )
+    get_user_model().objects.filter(
+        email__in=[fixture["email"] for fixture in fixtures]
+    ).delete()
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries run through it."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@functools.cache
+def sample_image():
+    """Return the bytes of a small JPEG image."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def request_host():
+    """Return a host name the site accepts."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def list_recipes(client, fixture, rng):
+    """Fetch the first page of recipes."""
+    return client.get(reverse("recipe:recipe-list"))
+
+
+def recipe_detail(client, fixture, rng):
+    """Fetch a random recipe."""
+    recipe_id = rng.choice(fixture["recipes"])
+    return client.get(reverse("recipe:recipe-detail", args=[recipe_id]))
+
+
+def filter_recipes(client, fixture, rng):
+    """List recipes with two random tags and ingredients."""
+    params = {
+        field_name: ",".join(
+            str(item) for item in rng.sample(fixture[field_name], 2)
+        )
+        for field_name in ("tags", "ingredients")
+        if len(fixture[field_name]) >= 2
+    }
+    return client.get(reverse("recipe:recipe-list"), params)
+
+
+def create_recipe(client, fixture, rng):
+    """Create a recipe with one tag and one ingredient."""
+    payload = {
+        "title": f"Created {rng.randint(0, 10 ** 6)}",
+        "time_minutes": rng.randint(5, 120),
+        "price": f"{rng.randint(100, 5000) / 100:.2f}",
+        "tags": [{"name": f"tags {rng.randint(0, 50)}"}],
+        "ingredients": [{"name": f"ingredients {rng.randint(0, 50)}"}],
+    }
+    return client.post(
+        reverse("recipe:recipe-list"), payload,
+        content_type="application/json",
+    )
+
+
+def upload_image(client, fixture, rng):
+    """Upload an image to a random recipe."""
+    recipe_id = rng.choice(fixture["recipes"])
+    image = SimpleUploadedFile(
+        "benchmark.jpg", sample_image(), content_type="image/jpeg"
+    )
+    response = client.post(
+        reverse("recipe:recipe-upload-image", args=[recipe_id]),
+        {"image": image},
+    )
+    if response.status_code == 202:
+        fixture["uploads"].append(response.data["image"])
+    return response
+
+
+def obtain_token(client, fixture, rng):
+    """Log in for a new token."""
+    return client.post(
+        reverse("user:token"),
+        {"email": fixture["email"], "password": PASSWORD},
+    )
+
+
+ENDPOINTS = {
+    "list": list_recipes,
+    "detail": recipe_detail,
+    "filter": filter_recipes,
+    "create": create_recipe,
+    "upload": upload_image,
+    "token": obtain_token,
+}
+
+
+def positive_int(value):
+    """Argument type for integers of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return number
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of sorted values."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def drive(send, fixtures, total, concurrency, seed_value):
+    """Send total requests from concurrency threads and summarise them."""
+    counter = itertools.count()
+    samples = []
+    host = request_host()
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        client = Client(raise_request_exception=False, HTTP_HOST=host)
+        try:
+            while next(counter) < total:
+                fixture = rng.choice(fixtures)
+                client.defaults["HTTP_AUTHORIZATION"] = (
+                    f"Token {fixture['token']}"
+                )
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    start = time.perf_counter()
+                    response = send(client, fixture, rng)
+                    elapsed = time.perf_counter() - start
+                samples.append(
+                    (elapsed, queries.count, response.status_code)
+                )
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed for elapsed, _, _ in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, code in samples if code >= 400),
+        "requests_per_second": round(len(samples) / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_per_request": round(
+            statistics.mean(count for _, count, _ in samples), 2
+        ),
+    }
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API endpoints."""
+
+    help = (
+        "Seed sample data and report latency percentiles, requests per "
+        "second and queries per request for the main API endpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=positive_int, default=5,
+            help="Users to seed; requests are spread across them.",
+        )
+        parser.add_argument(
+            "--recipes", type=positive_int, default=200,
+            help="Recipes per user.",
+        )
+        parser.add_argument(
+            "--tags", type=positive_int, default=20,
+            help="Tags per user.",
+        )
+        parser.add_argument(
+            "--ingredients", type=positive_int, default=50,
+            help="Ingredients per user.",
+        )
+        parser.add_argument(
+            "--related", type=positive_int, default=3,
+            help="Tags and ingredients per recipe.",
+        )
+        parser.add_argument(
+            "--endpoint", action="append", choices=list(ENDPOINTS),
+            help="Endpoint to benchmark, repeat for several. Default all.",
+        )
+        parser.add_argument(
+            "--requests", type=positive_int, default=200,
+            help="Requests per endpoint.",
+        )
+        parser.add_argument(
+            "--concurrency", type=positive_int, default=8,
+            help="Threads sending requests at once.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Random seed for the data and the request sequence.",
+        )
+        parser.add_argument(
+            "--json", metavar="PATH",
+            help="Also write the results as JSON to PATH, - for stdout.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        rng = random.Random(options["seed"])
+        fixtures = []
+        results = {}
+        try:
+            seed(options, rng, fixtures)
+            for name in options["endpoint"] or ENDPOINTS:
+                results[name] = drive(
+                    ENDPOINTS[name], fixtures, options["requests"],
+                    options["concurrency"], options["seed"],
+                )
+                if options["json"] != "-":
+                    self.stdout.write(
+                        "{name}: {requests} requests, {errors} errors, "
+                        "{requests_per_second} req/s, p50 {p50_ms} ms, "
+                        "p95 {p95_ms} ms, p99 {p99_ms} ms, "
+                        "{queries_per_request} queries per request".format(
+                            name=name, **results[name]
+                        )
+                    )
+        finally:
+            cleanup(fixtures)
+
+        if options["json"]:
+            report = {
+                "options": {
+                    key: options[key] for key in (
+                        "users", "recipes", "tags", "ingredients", "related",
+                        "requests", "concurrency", "seed",
+                    )
+                },
+                "results": results,
+            }
+            if options["json"] == "-":
+                self.stdout.write(json.dumps(report, indent=2))
+            else:
+                with open(options["json"], "w") as f:
+                    json.dump(report, f, indent=2)
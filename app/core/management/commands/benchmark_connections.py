@@ -0,0 +1,91 @@
+"""
+Django command to measure per-request database connection cost.
+Each simulated request opens the request cycle like Django's handler,
+runs a query and closes the cycle, under different connection settings,
+including a connection pool.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+MODES = [
+    ("new connection per request", 0, False, False),
+    ("persistent", None, False, False),
+    ("persistent with health checks", None, True, False),
+    ("pooled", 0, False, True),
+]
+
+
+def time_requests(count, max_age, health_checks, pool=False):
+    """Return per-request timings in seconds for the given settings."""
+    settings_dict = connection.settings_dict
+    original = {
+        key: settings_dict[key]
+        for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")
+    }
+    options = {
+        key: value for key, value in original["OPTIONS"].items()
+        if key != "pool"
+    }
+    if pool:
+        options["pool"] = True
+    # close_pool only closes the pool the current OPTIONS configure.
+    connection.close()
+    connection.close_pool()
+    settings_dict.update({
+        "CONN_MAX_AGE": max_age,
+        "CONN_HEALTH_CHECKS": health_checks,
+        "OPTIONS": options,
+    })
+    timings = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            close_old_connections()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            close_old_connections()
+            timings.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+        connection.close_pool()
+        settings_dict.update(original)
+    return timings
+
+
+class Command(BaseCommand):
+    """Django command to benchmark database connection reuse."""
+
+    help = (
+        "Time simulated requests opening a new database connection each "
+        "time against persistent connections, with and without health "
+        "checks, and against a connection pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=200,
+            help="Simulated requests per mode.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        baseline = None
+        for name, max_age, health_checks, pool in MODES:
+            timings = time_requests(
+                options["requests"], max_age, health_checks, pool
+            )
+            median = statistics.median(timings) * 1000
+            line = (
+                f"{name}: median {median:.2f} ms, "
+                f"mean {statistics.mean(timings) * 1000:.2f} ms per request"
+            )
+            if baseline is None:
+                baseline = median
+            else:
+                line += f", {baseline - median:.2f} ms saved"
+            self.stdout.write(line)
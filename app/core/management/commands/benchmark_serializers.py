@@ -0,0 +1,135 @@
+"""
+Django command to compare model and fast read serializers.
+Sample data is created in a transaction that is rolled back,
+so it can run against any database.
+"""
+
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import (
+    RecipeDetailReadSerializer,
+    RecipeDetailSerializer,
+    RecipeSerializer,
+    StoredRecipeSerializer,
+    TagReadSerializer,
+    TagSerializer,
+    refresh_list_payloads,
+)
+
+
+def create_sample(count, related):
+    """Create a user with count recipes, each linked to related names."""
+    user = get_user_model().objects.create_user(
+        f"benchmark-{uuid.uuid4().hex}@example.com"
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f"Recipe {i}",
+            time_minutes=i % 120,
+            price=Decimal(i % 10000) / 100,
+            link=f"https://example.com/recipes/{i}",
+            description="Benchmark recipe " * 10,
+        )
+        for i in range(count)
+    )
+    for model, field_name in ((Tag, "tags"), (Ingredient, "ingredients")):
+        items = model.objects.bulk_create(
+            model(user=user, name=f"{field_name} {i}")
+            for i in range(related * 10)
+        )
+        through = getattr(Recipe, field_name).through
+        through.objects.bulk_create(
+            through(**{
+                "recipe_id": recipe.id,
+                f"{model._meta.model_name}_id": items[
+                    (n + i * related) % len(items)
+                ].id,
+            })
+            for n, recipe in enumerate(recipes)
+            for i in range(related)
+        )
+    refresh_list_payloads([recipe.id for recipe in recipes])
+    return user
+
+
+def best_of(repeat, render):
+    """Return the fastest of repeat timed runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark read serializers."""
+
+    help = (
+        "Time rendering recipe, detail and tag responses to JSON with the "
+        "model serializers and the fast read paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes", type=int, default=1000,
+            help="Recipes per response.",
+        )
+        parser.add_argument(
+            "--related", type=int, default=5,
+            help="Tags and ingredients per recipe.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5,
+            help="Timed runs per serializer; the fastest is reported.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        renderer = JSONRenderer()
+        with transaction.atomic():
+            user = create_sample(options["recipes"], options["related"])
+            recipes = list(
+                Recipe.objects.filter(user=user).order_by("-id")
+                .prefetch_related("tags", "ingredients")
+            )
+            stored = list(
+                Recipe.objects.filter(user=user).order_by("-id")
+                .select_related("list_payload")
+            )
+            tags = list(Tag.objects.filter(user=user).order_by("-name"))
+            tag_rows = [{"id": tag.id, "name": tag.name} for tag in tags]
+            cases = [
+                ("recipe list", RecipeSerializer, recipes,
+                 StoredRecipeSerializer, stored),
+                ("recipe detail", RecipeDetailSerializer, recipes,
+                 RecipeDetailReadSerializer, recipes),
+                ("tag list", TagSerializer, tags,
+                 TagReadSerializer, tag_rows),
+            ]
+            for name, slow, slow_data, fast, fast_data in cases:
+                slow_body = renderer.render(slow(slow_data, many=True).data)
+                fast_body = renderer.render(fast(fast_data, many=True).data)
+                slow_time = best_of(options["repeat"], lambda: renderer.render(
+                    slow(slow_data, many=True).data
+                ))
+                fast_time = best_of(options["repeat"], lambda: renderer.render(
+                    fast(fast_data, many=True).data
+                ))
+                self.stdout.write(
+                    f"{name}: {len(slow_data)} items, "
+                    f"model {1 / slow_time:.1f} responses/s, "
+                    f"fast {1 / fast_time:.1f} responses/s, "
+                    f"{slow_time / fast_time:.1f}x, "
+                    f"identical output: {slow_body == fast_body}"
+                )
+            transaction.set_rollback(True)
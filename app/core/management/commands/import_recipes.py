@@ -0,0 +1,366 @@
+"""
+Django command to bulk import recipes from a JSONL or CSV file.
+Records are streamed from disk and written in batches, split between
+worker processes, with checkpoints so imports can be resumed.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core.models import ImportCheckpoint, Ingredient, Recipe, Tag
+from recipe.cache import bump_generation
+
+FORMATS = ("jsonl", "csv")
+
+
+def read_records(path, fmt, owns=None):
+    """Yield (position, record, error) tuples, streaming the file.
+
+    Lines that cannot be decoded are yielded with a None record and the
+    error, so they can be skipped without stopping the import. When owns
+    is given, only positions it accepts are decoded and yielded; CSV rows
+    may span lines, so they are still parsed but not post-processed.
+    """
+    with open(path, newline="", encoding="utf-8") as source:
+        if fmt == "csv":
+            for position, row in enumerate(csv.DictReader(source), 1):
+                if owns is not None and not owns(position):
+                    continue
+                for key in ("tags", "ingredients"):
+                    value = row.get(key) or ""
+                    row[key] = [n for n in value.split(";") if n]
+                yield position, row, None
+        else:
+            for position, line in enumerate(source, 1):
+                if owns is not None and not owns(position):
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield position, None, f"invalid JSON: {exc}"
+                    continue
+                if not isinstance(record, dict):
+                    yield position, None, "not a JSON object"
+                    continue
+                yield position, record, None
+
+
+def text_value(record, name):
+    """Return a string field of a record, "" when missing."""
+    value = record.get(name)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    return value
+
+
+def name_list(record, name):
+    """Return a list of tag or ingredient names of a record."""
+    value = record.get(name)
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(
+        isinstance(item, str) for item in value
+    ):
+        raise ValueError(f"{name} must be a list of strings")
+    return [item[:255] for item in value]
+
+
+def parse_record(record):
+    """Return the recipe fields and related names or raise ValueError."""
+    title = text_value(record, "title").strip()
+    if not title:
+        raise ValueError("title is required")
+    fields = {"title": title[:255]}
+    for name in ("time_minutes", "price"):
+        field = Recipe._meta.get_field(name)
+        value = record.get(name)
+        try:
+            if name == "price":
+                value = Decimal(str(value)).quantize(
+                    Decimal(1).scaleb(-field.decimal_places)
+                )
+            # Checks the value fits the column, e.g. price max_digits.
+            fields[name] = field.clean(value, None)
+        except (TypeError, ValueError, InvalidOperation) as exc:
+            raise ValueError(f"invalid {name}: {exc!r}")
+        except ValidationError as exc:
+            raise ValueError(f"invalid {name}: {' '.join(exc.messages)}")
+    fields.update({
+        "link": text_value(record, "link")[:255],
+        "description": text_value(record, "description"),
+    })
+    tags = name_list(record, "tags")
+    ingredients = name_list(record, "ingredients")
+    return fields, tags, ingredients
+
+
+class NameResolver:
+    """Map (user id, name) to ids, creating missing rows in bulk."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def resolve(self, pairs):
+        missing = {}
+        for user_id, name in pairs:
+            if (user_id, name) not in self.ids:
+                missing.setdefault(user_id, set()).add(name)
+        # Insert in a fixed order so workers creating the same names
+        # wait for each other instead of deadlocking.
+        for user_id, names in sorted(missing.items()):
+            existing = self.model.objects.filter(
+                user_id=user_id, name__in=names
+            ).values_list("name", "id")
+            self.ids.update(((user_id, name), pk) for name, pk in existing)
+            new = [n for n in names if (user_id, n) not in self.ids]
+            if not new:
+                continue
+            self.model.objects.bulk_create(
+                [self.model(user_id=user_id, name=n) for n in sorted(new)],
+                ignore_conflicts=True,
+            )
+            created = self.model.objects.filter(
+                user_id=user_id, name__in=new
+            ).values_list("name", "id")
+            self.ids.update(((user_id, name), pk) for name, pk in created)
+
+    def forget(self):
+        """Drop ids that may belong to a rolled back transaction."""
+        self.ids.clear()
+
+
+class Importer:
+    """Import the batches of a file assigned to one worker.
+
+    The file is split into ranges of batch_size records and worker index
+    takes every workers-th range. Each range is committed together with a
+    checkpoint keyed by the file and the range's first offset, so resumed
+    imports skip committed records whatever the number of workers.
+    """
+
+    def __init__(self, path, fmt, index, workers, batch_size, stdout):
+        self.path = path
+        self.fmt = fmt
+        self.index = index
+        self.workers = workers
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.prefix = f"{os.path.abspath(path)}:"
+        self.users = {}
+        self.tags = NameResolver(Tag)
+        self.ingredients = NameResolver(Ingredient)
+        self.imported = 0
+        self.skipped = 0
+
+    def _committed(self):
+        """Return the committed (start, end] ranges, merged and sorted."""
+        ranges = []
+        for key, end in ImportCheckpoint.objects.filter(
+            key__startswith=self.prefix
+        ).values_list("key", "position"):
+            start = key[len(self.prefix):]
+            if start.isdigit():
+                ranges.append((int(start), end))
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _user_id(self, email):
+        if email not in self.users:
+            self.users[email] = (
+                get_user_model().objects.filter(email__iexact=email)
+                .values_list("id", flat=True).first()
+            )
+        return self.users[email]
+
+    def _skip(self, position, reason):
+        self.skipped += 1
+        self.stdout.write(f"Record {position} skipped: {reason}\n")
+
+    def _write(self, batch, start, end):
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(user_id=user_id, **fields)
+             for user_id, fields, _, _ in batch]
+        )
+        for resolver, field_name, offset in (
+            (self.tags, "tags", 2),
+            (self.ingredients, "ingredients", 3),
+        ):
+            pairs = {
+                (item[0], name) for item in batch for name in item[offset]
+            }
+            resolver.resolve(pairs)
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            through.objects.bulk_create(
+                [
+                    through(**{
+                        field.m2m_column_name(): recipe.id,
+                        field.m2m_reverse_name(): resolver.ids[
+                            (item[0], name)
+                        ],
+                    })
+                    for recipe, item in zip(recipes, batch)
+                    for name in set(item[offset])
+                ],
+                batch_size=self.batch_size,
+            )
+        ImportCheckpoint.objects.update_or_create(
+            key=f"{self.prefix}{start}", defaults={"position": end}
+        )
+
+    def _flush(self, batch, start, end):
+        try:
+            with transaction.atomic():
+                self._write(batch, start, end)
+        except Exception:
+            self.tags.forget()
+            self.ingredients.forget()
+            raise
+        for user_id in {item[0] for item in batch}:
+            bump_generation(user_id)
+        self.imported += len(batch)
+        self.stdout.write(
+            f"[worker {self.index}] {self.imported} imported, "
+            f"{self.skipped} skipped, at record {end}\n"
+        )
+
+    def _batch_number(self, position):
+        return (position - 1) // self.batch_size
+
+    def _owns(self, position):
+        """Return whether the record at position belongs to this worker."""
+        return self._batch_number(position) % self.workers == self.index
+
+    def run(self):
+        committed = self._committed()
+        batch = []
+        start = end = None
+        fresh = False
+        for position, record, error in read_records(
+            self.path, self.fmt, self._owns
+        ):
+            number = self._batch_number(position)
+            if start is not None and start != number * self.batch_size:
+                if fresh:
+                    self._flush(batch, start, end)
+                batch = []
+                fresh = False
+            start = number * self.batch_size
+            end = position
+            while committed and committed[0][1] < position:
+                committed.pop(0)
+            if committed and committed[0][0] < position:
+                continue
+            fresh = True
+            if error:
+                self._skip(position, error)
+                continue
+            try:
+                email = text_value(record, "user").strip()
+                user_id = self._user_id(email)
+                if user_id is None:
+                    raise ValueError(f"unknown user {email!r}")
+                fields, tags, ingredients = parse_record(record)
+            except ValueError as exc:
+                self._skip(position, exc)
+                continue
+            batch.append((user_id, fields, tags, ingredients))
+        if fresh:
+            self._flush(batch, start, end)
+        return self.imported, self.skipped
+
+
+def import_partition(path, fmt, index, workers, batch_size):
+    """Entry point for worker processes."""
+    try:
+        return Importer(
+            path, fmt, index, workers, batch_size, sys.stdout
+        ).run()
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes."""
+
+    help = (
+        "Import recipes from a JSONL or CSV file. Each record needs a user "
+        "email, title, time_minutes and price, and may carry link, "
+        "description, tags and ingredients (';'-separated in CSV)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL or CSV file to import.")
+        parser.add_argument(
+            "--format", choices=FORMATS,
+            help="File format, guessed from the extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Records written per transaction.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Worker processes; batches are split between them.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"File {path} does not exist.")
+        fmt = options["format"]
+        if fmt is None:
+            fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+        workers = options["workers"]
+        batch_size = options["batch_size"]
+
+        if workers == 1:
+            results = [
+                Importer(path, fmt, 0, 1, batch_size, self.stdout).run()
+            ]
+        else:
+            # Children must not share the parent's database connections,
+            # nor a connection pool whose threads do not survive the fork.
+            connections.close_all()
+            for conn in connections.all(initialized_only=True):
+                if hasattr(conn, "close_pool"):
+                    conn.close_pool()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                results = list(executor.map(
+                    import_partition,
+                    [path] * workers,
+                    [fmt] * workers,
+                    range(workers),
+                    [workers] * workers,
+                    [batch_size] * workers,
+                ))
+
+        imported = sum(result[0] for result in results)
+        skipped = sum(result[1] for result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} recipes, skipped {skipped}."
+        ))
@@ -0,0 +1,92 @@
+"""
+Django command to process queued recipe image jobs.
+Runs as a long-lived worker next to the web server
+so uploads do not wait for image resizing.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.images import claim_jobs, run_job
+from recipe.cache import bump_generation
+
+logger = logging.getLogger("core.images")
+
+
+class Command(BaseCommand):
+    """Django command to process queued recipe image jobs."""
+
+    help = "Render queued recipe image renditions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=2,
+            help="Number of images processed at the same time.",
+        )
+        parser.add_argument(
+            "--max-attempts", type=int, default=3,
+            help="Attempts before a job is marked as failed.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-after", type=int, default=300,
+            help="Seconds after which a running job is retried.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit once the queue is empty.",
+        )
+
+    def _run(self, job, max_attempts):
+        # One broken job must not stop the worker; a job left running is
+        # picked up again once it is stale.
+        try:
+            ready = run_job(job, max_attempts)
+            bump_generation(job.recipe.user_id)
+        except Exception as exc:
+            logger.exception("Image job %s crashed", job.pk)
+            job.last_error = repr(exc)
+            return False
+        return ready
+
+    def _run_in_thread(self, job, max_attempts):
+        try:
+            return self._run(job, max_attempts)
+        finally:
+            close_old_connections()
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        concurrency = options["concurrency"]
+        max_attempts = options["max_attempts"]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                jobs = claim_jobs(
+                    concurrency, options["stale_after"], max_attempts
+                )
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                if concurrency > 1:
+                    results = executor.map(
+                        lambda job: self._run_in_thread(job, max_attempts),
+                        jobs,
+                    )
+                else:
+                    results = [self._run(job, max_attempts) for job in jobs]
+                for job, ready in zip(jobs, results):
+                    if ready:
+                        self.stdout.write(f"Processed recipe {job.recipe_id}")
+                    else:
+                        self.stdout.write(self.style.WARNING(
+                            f"Failed recipe {job.recipe_id}: {job.last_error}"
+                        ))
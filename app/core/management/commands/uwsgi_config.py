@@ -0,0 +1,129 @@
+"""
+Django command to print a uwsgi config sized for the container.
+Worker counts follow the CPU quota and memory limit of the cgroup the
+server runs in, falling back to the host's CPUs and memory.
+"""
+
+import math
+import os
+
+from django.core.management.base import BaseCommand
+
+# Settings read from the environment, with their defaults. The names are
+# uwsgi's own environment options, so a value exported for the generator
+# means the same thing to uwsgi. Empty values count as unset.
+DEFAULTS = {
+    "UWSGI_THREADS": 1,
+    # Seconds a request may take. Streamed responses, such as recipe
+    # exports, may take up to the harakiri, see RequestHarakiriMiddleware.
+    "UWSGI_REQUEST_HARAKIRI": 60,
+    "UWSGI_HARAKIRI": 900,
+    "UWSGI_MAX_REQUESTS": 5000,
+    "UWSGI_RELOAD_ON_RSS": 256,
+}
+
+
+def read_file(path):
+    """Return the stripped contents of path, or None if unreadable."""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    """Return the CPUs available, honouring a cgroup CPU quota."""
+    cpus = len(os.sched_getaffinity(0))
+    quota = period = None
+    cpu_max = read_file("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, period = cpu_max.split()
+    else:
+        quota = read_file("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = read_file("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period and quota not in ("max", "-1"):
+        cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    return cpus
+
+
+def memory_limit():
+    """Return the memory available in MiB, honouring a cgroup limit."""
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    limit = read_file("/sys/fs/cgroup/memory.max") or read_file(
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+    )
+    if limit and limit != "max":
+        memory = min(memory, int(limit))
+    return memory // 2 ** 20
+
+
+def listen_limit():
+    """Return the kernel's cap on a socket's listen backlog."""
+    return int(read_file("/proc/sys/net/core/somaxconn") or 128)
+
+
+def env_int(environ, name, default):
+    """Return name from environ as an integer, or default if unset."""
+    value = environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def build_config(cpus, memory, somaxconn, environ):
+    """Return the uwsgi options for the given limits as a dict."""
+    values = {
+        name: env_int(environ, name, default)
+        for name, default in DEFAULTS.items()
+    }
+    threads = values["UWSGI_THREADS"]
+    rss = values["UWSGI_RELOAD_ON_RSS"]
+    # 2n + 1 workers keep the CPUs busy while others wait on the
+    # database. Each needs up to reload-on-rss MiB, and one more share
+    # is left for the master and the memory workers have in common.
+    workers = env_int(environ, "UWSGI_WORKERS", 0) or max(
+        1, min(2 * cpus + 1, memory // rss - 1)
+    )
+    max_requests = values["UWSGI_MAX_REQUESTS"]
+    return {
+        "socket": ":9000",
+        "module": "app.wsgi",
+        "master": "true",
+        # Load Django once in the master and fork the workers from it,
+        # so they share its memory copy-on-write.
+        "lazy-apps": "false",
+        "workers": workers,
+        "threads": threads,
+        "enable-threads": "true",
+        "thunder-lock": "true",
+        "single-interpreter": "true",
+        "need-app": "true",
+        "die-on-term": "true",
+        "vacuum": "true",
+        "listen": min(somaxconn, max(128, 64 * workers * threads)),
+        "harakiri": values["UWSGI_HARAKIRI"],
+        "request-harakiri": values["UWSGI_REQUEST_HARAKIRI"],
+        # Recycle workers to bound memory growth, staggered so they do
+        # not all restart at once.
+        "max-requests": max_requests,
+        "max-requests-delta": max(1, max_requests // (10 * workers)),
+        "reload-on-rss": rss,
+        "worker-reload-mercy": values["UWSGI_REQUEST_HARAKIRI"],
+    }
+
+
+class Command(BaseCommand):
+    """Django command to generate the uwsgi config."""
+
+    help = (
+        "Print a uwsgi ini config with worker, thread and recycling "
+        "settings derived from the container's CPU and memory limits."
+    )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        config = build_config(
+            cpu_limit(), memory_limit(), listen_limit(), os.environ
+        )
+        self.stdout.write("[uwsgi]")
+        for name, value in config.items():
+            self.stdout.write(f"{name} = {value}")
@@ -5,7 +5,7 @@ is up and running before starting the application.
 """
 
 import time
-from psycopg2 import OperationalError as Psycopg2Error
+from psycopg import OperationalError as PsycopgError
 
 from django.db.utils import OperationalError
 from django.core.management.base import BaseCommand
@@ -22,7 +22,7 @@ class Command(BaseCommand):
             try:
                 self.check(databases=["default"])
                 db_up = True
-            except (Psycopg2Error, OperationalError):
+            except (PsycopgError, OperationalError):
                 self.stdout.write("Database unavailable, waiting 1 second...")
                 time.sleep(1)
 
@@ -0,0 +1,189 @@
+"""
+Middleware for the API.
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+try:
+    import uwsgi
+except ImportError:
+    uwsgi = None
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    """Execute wrapper counting a request's queries and database time.
+
+    Also keeps the time and database time at which the view and the
+    rendering started, to split the request into its phases.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.start = time.perf_counter()
+        self.view = None
+        self.render = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def mark(self):
+        """Return the current time and database time."""
+        return time.perf_counter(), self.db
+
+    def durations(self):
+        """Return the duration of each phase in milliseconds.
+
+        view is the time spent in the view outside queries, mostly
+        serializing; render is the time spent rendering the response.
+        """
+        end = self.mark()
+        view_end = self.render or end
+        durations = {"db": self.db, "view": 0.0, "render": 0.0}
+        if self.view:
+            durations["view"] = (
+                view_end[0] - self.view[0] - (view_end[1] - self.view[1])
+            )
+        if self.render:
+            durations["render"] = (
+                end[0] - self.render[0] - (end[1] - self.render[1])
+            )
+        durations["total"] = end[0] - self.start
+        return {name: value * 1000 for name, value in durations.items()}
+
+
+class RequestTimingMiddleware:
+    """Time the queries, view and rendering of each request.
+
+    The timings are sent in a Server-Timing header and logged, at
+    warning level when a request runs more than REQUEST_QUERY_BUDGET
+    queries or REQUEST_DB_TIME_BUDGET milliseconds of them. Streamed
+    content is not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Avoid running the hooks in a thread for async requests.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.timing = RequestTiming()
+        with connection.execute_wrapper(request.timing):
+            response = self.get_response(request)
+        self.report(request, response)
+        return response
+
+    async def __acall__(self, request):
+        request.timing = RequestTiming()
+        # Queries run in the request's sync thread, which has its own
+        # connection, so the wrapper is installed there.
+        stack = ExitStack()
+        await sync_to_async(self._watch_queries)(stack, request.timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.report(request, response)
+        return response
+
+    @staticmethod
+    def _watch_queries(stack, timing):
+        stack.enter_context(connection.execute_wrapper(timing))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view = request.timing.mark()
+
+    def process_template_response(self, request, response):
+        request.timing.render = request.timing.mark()
+        return response
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view = request.timing.mark()
+
+    async def aprocess_template_response(self, request, response):
+        request.timing.render = request.timing.mark()
+        return response
+
+    def report(self, request, response):
+        """Add the Server-Timing header and log the request."""
+        timing = request.timing
+        durations = timing.durations()
+        response.headers["Server-Timing"] = ", ".join(
+            f'db;dur={durations["db"]:.1f};desc="{timing.queries} queries"'
+            if name == "db" else f"{name};dur={duration:.1f}"
+            for name, duration in durations.items()
+        )
+
+        over_budget = (
+            timing.queries > settings.REQUEST_QUERY_BUDGET
+            or durations["db"] > settings.REQUEST_DB_TIME_BUDGET
+        )
+        level = logging.WARNING if over_budget else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        match = request.resolver_match
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": match.view_name if match else "",
+            "status": response.status_code,
+            "queries": timing.queries,
+            **{f"{name}_ms": round(value, 1)
+               for name, value in durations.items()},
+        }
+        logger.log(
+            level,
+            "%s%s",
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            " over_budget=true" if over_budget else "",
+            extra=fields,
+        )
+
+
+class RequestHarakiriMiddleware:
+    """Limit each request's time under uwsgi, except for streams.
+
+    uwsgi's harakiri bounds the whole response, so the uwsgi_config
+    command sets it for the longest streamed export and passes the
+    limit for other requests as request-harakiri. Each request arms a
+    timer with that limit, which streaming responses disarm.
+    """
+
+    def __init__(self, get_response):
+        self.limit = int(uwsgi.opt.get("request-harakiri", 0)) if uwsgi else 0
+        if not self.limit:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        uwsgi.set_user_harakiri(self.limit)
+        response = self.get_response(request)
+        if response.streaming:
+            uwsgi.set_user_harakiri(0)
+        return response
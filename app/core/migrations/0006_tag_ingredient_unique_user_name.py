@@ -0,0 +1,61 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate (user, name) rows into the oldest one."""
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, field_name in (
+        ("Tag", "tags"),
+        ("Ingredient", "ingredients"),
+    ):
+        Model = apps.get_model("core", model_name)
+        Through = Recipe._meta.get_field(field_name).remote_field.through
+        fk = f"{model_name.lower()}_id"
+        duplicates = (
+            Model.objects.values("user_id", "name")
+            .annotate(count=Count("id"), keep_id=Min("id"))
+            .filter(count__gt=1)
+        )
+        for dup in duplicates:
+            others = Model.objects.filter(
+                user_id=dup["user_id"], name=dup["name"]
+            ).exclude(id=dup["keep_id"])
+            recipe_ids = set(
+                Through.objects.filter(**{f"{fk}__in": others})
+                .values_list("recipe_id", flat=True)
+            )
+            Through.objects.bulk_create(
+                [
+                    Through(recipe_id=recipe_id, **{fk: dup["keep_id"]})
+                    for recipe_id in recipe_ids
+                ],
+                ignore_conflicts=True,
+            )
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names, migrations.RunPython.noop
+        ),
+        # Fire the deferred FK checks queued by the merge now; Postgres
+        # refuses to ALTER a table with pending trigger events.
+        migrations.RunSQL(
+            "SET CONSTRAINTS ALL IMMEDIATE", migrations.RunSQL.noop
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_user_name'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:47
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_TRIGGERS_SQL = """
+CREATE FUNCTION core_recipe_search_vector(r_id bigint, r_title text, r_description text)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(r_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(r_description, '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_tag t JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r_id
+        ), '')), 'C')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r_id
+        ), '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION core_recipe_search_vector_set() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_vector(NEW.id, NEW.title, NEW.description);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_search_vector_set
+BEFORE INSERT OR UPDATE OF title, description, search_vector ON core_recipe
+FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_set();
+
+-- Setting search_vector to NULL fires the row trigger above.
+CREATE FUNCTION core_recipe_search_vector_links() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe SET search_vector = NULL
+    WHERE id IN (SELECT recipe_id FROM changed);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_tags_insert_search AFTER INSERT ON core_recipe_tags
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_search_vector_links();
+CREATE TRIGGER core_recipe_tags_delete_search AFTER DELETE ON core_recipe_tags
+REFERENCING OLD TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_search_vector_links();
+CREATE TRIGGER core_recipe_ingredients_insert_search AFTER INSERT ON core_recipe_ingredients
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_search_vector_links();
+CREATE TRIGGER core_recipe_ingredients_delete_search AFTER DELETE ON core_recipe_ingredients
+REFERENCING OLD TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_search_vector_links();
+
+CREATE FUNCTION core_tag_search_vector_rename() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe SET search_vector = NULL
+    WHERE id IN (
+        SELECT rt.recipe_id FROM core_recipe_tags rt
+        JOIN changed c ON c.id = rt.tag_id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_tag_update_search AFTER UPDATE ON core_tag
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_tag_search_vector_rename();
+
+CREATE FUNCTION core_ingredient_search_vector_rename() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe SET search_vector = NULL
+    WHERE id IN (
+        SELECT ri.recipe_id FROM core_recipe_ingredients ri
+        JOIN changed c ON c.id = ri.ingredient_id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_ingredient_update_search AFTER UPDATE ON core_ingredient
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_ingredient_search_vector_rename();
+
+UPDATE core_recipe SET search_vector = NULL;
+"""
+
+DROP_SEARCH_TRIGGERS_SQL = """
+DROP TRIGGER core_ingredient_update_search ON core_ingredient;
+DROP TRIGGER core_tag_update_search ON core_tag;
+DROP TRIGGER core_recipe_ingredients_delete_search ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_ingredients_insert_search ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_tags_delete_search ON core_recipe_tags;
+DROP TRIGGER core_recipe_tags_insert_search ON core_recipe_tags;
+DROP TRIGGER core_recipe_search_vector_set ON core_recipe;
+DROP FUNCTION core_ingredient_search_vector_rename();
+DROP FUNCTION core_tag_search_vector_rename();
+DROP FUNCTION core_recipe_search_vector_links();
+DROP FUNCTION core_recipe_search_vector_set();
+DROP FUNCTION core_recipe_search_vector(bigint, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGERS_SQL, DROP_SEARCH_TRIGGERS_SQL),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
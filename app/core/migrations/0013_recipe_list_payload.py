@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+EXPIRE_TRIGGERS_SQL = """
+-- Locking the recipes first makes the delete wait for a payload that is
+-- being rendered concurrently, so a stale payload is never left behind.
+CREATE FUNCTION core_recipe_list_payload_expire(recipe_ids bigint[])
+RETURNS void AS $$
+BEGIN
+    PERFORM 1 FROM core_recipe WHERE id = ANY(recipe_ids)
+    ORDER BY id FOR UPDATE;
+    DELETE FROM core_recipelistpayload WHERE recipe_id = ANY(recipe_ids);
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION core_recipe_list_payload_recipe() RETURNS trigger AS $$
+BEGIN
+    PERFORM core_recipe_list_payload_expire(ARRAY[NEW.id]);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_update_list_payload AFTER UPDATE ON core_recipe
+FOR EACH ROW
+WHEN ((OLD.title, OLD.time_minutes, OLD.price, OLD.link)
+      IS DISTINCT FROM (NEW.title, NEW.time_minutes, NEW.price, NEW.link))
+EXECUTE FUNCTION core_recipe_list_payload_recipe();
+
+CREATE FUNCTION core_recipe_list_payload_links() RETURNS trigger AS $$
+BEGIN
+    PERFORM core_recipe_list_payload_expire(
+        ARRAY(SELECT recipe_id FROM changed)
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_tags_insert_list_payload AFTER INSERT ON core_recipe_tags
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_list_payload_links();
+CREATE TRIGGER core_recipe_tags_delete_list_payload AFTER DELETE ON core_recipe_tags
+REFERENCING OLD TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_list_payload_links();
+CREATE TRIGGER core_recipe_ingredients_insert_list_payload AFTER INSERT ON core_recipe_ingredients
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_list_payload_links();
+CREATE TRIGGER core_recipe_ingredients_delete_list_payload AFTER DELETE ON core_recipe_ingredients
+REFERENCING OLD TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_list_payload_links();
+
+CREATE FUNCTION core_tag_list_payload_rename() RETURNS trigger AS $$
+BEGIN
+    PERFORM core_recipe_list_payload_expire(ARRAY(
+        SELECT rt.recipe_id FROM core_recipe_tags rt
+        JOIN changed c ON c.id = rt.tag_id
+    ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_tag_update_list_payload AFTER UPDATE ON core_tag
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_tag_list_payload_rename();
+
+CREATE FUNCTION core_ingredient_list_payload_rename() RETURNS trigger AS $$
+BEGIN
+    PERFORM core_recipe_list_payload_expire(ARRAY(
+        SELECT ri.recipe_id FROM core_recipe_ingredients ri
+        JOIN changed c ON c.id = ri.ingredient_id
+    ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_ingredient_update_list_payload AFTER UPDATE ON core_ingredient
+REFERENCING NEW TABLE AS changed
+FOR EACH STATEMENT EXECUTE FUNCTION core_ingredient_list_payload_rename();
+"""
+
+DROP_EXPIRE_TRIGGERS_SQL = """
+DROP TRIGGER core_ingredient_update_list_payload ON core_ingredient;
+DROP TRIGGER core_tag_update_list_payload ON core_tag;
+DROP TRIGGER core_recipe_ingredients_delete_list_payload ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_ingredients_insert_list_payload ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_tags_delete_list_payload ON core_recipe_tags;
+DROP TRIGGER core_recipe_tags_insert_list_payload ON core_recipe_tags;
+DROP TRIGGER core_recipe_update_list_payload ON core_recipe;
+DROP FUNCTION core_ingredient_list_payload_rename();
+DROP FUNCTION core_tag_list_payload_rename();
+DROP FUNCTION core_recipe_list_payload_links();
+DROP FUNCTION core_recipe_list_payload_recipe();
+DROP FUNCTION core_recipe_list_payload_expire(bigint[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeListPayload',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='list_payload', serialize=False, to='core.recipe')),
+                ('payload', models.JSONField()),
+            ],
+        ),
+        migrations.RunSQL(EXPIRE_TRIGGERS_SQL, DROP_EXPIRE_TRIGGERS_SQL),
+    ]
@@ -5,7 +5,10 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -60,6 +63,12 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Recipe(models.Model):
     """Recipe model."""
 
+    class ImageStatus(models.TextChoices):
+        NONE = "", "No image"
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -72,11 +81,51 @@ class Recipe(models.Model):
     tags = models.ManyToManyField("Tag", blank=True)
     ingredients = models.ManyToManyField("Ingredient", blank=True)
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_renditions = models.JSONField(default=dict, blank=True)
+    image_status = models.CharField(
+        max_length=16,
+        choices=ImageStatus.choices,
+        default=ImageStatus.NONE,
+        blank=True,
+    )
+    # Maintained by database triggers, see migration 0011.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-id"],
+                name="recipe_user_id_desc_idx",
+            ),
+            GinIndex(
+                fields=["search_vector"],
+                name="recipe_search_vector_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class RecipeListPayload(models.Model):
+    """Pre-rendered list representation of a recipe.
+
+    Database triggers delete the row whenever the recipe, its links or
+    the names of its tags and ingredients change, see migration 0013.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="list_payload",
+    )
+    payload = models.JSONField()
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
 class Tag(models.Model):
     """Tag for filtering recipes."""
 
@@ -86,6 +135,21 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_tag_user_name",
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                fields=["name"],
+                name="tag_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -99,5 +163,71 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_ingredient_user_name",
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                fields=["name"],
+                name="ingredient_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class ImageJob(models.Model):
+    """Queued rendition work for an uploaded recipe image."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_jobs",
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "run_after"],
+                name="imagejob_status_run_after_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id}: {self.status}"
+
+
+class ImportCheckpoint(models.Model):
+    """Committed range of records of a resumable recipe import.
+
+    key is the file path and the offset the range starts after; position
+    is the offset of its last record.
+    """
+
+    key = models.CharField(max_length=512, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.position}"
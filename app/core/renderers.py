@@ -0,0 +1,78 @@
+"""
+Renderers for the API.
+"""
+
+import math
+from decimal import Decimal
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Types orjson handles natively that DRF's encoder formats differently.
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson else 0
+)
+
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+def has_non_finite(data):
+    """Return whether data holds a NaN or infinite float or Decimal."""
+    if isinstance(data, dict):
+        return any(has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_non_finite(value) for value in data)
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, Decimal):
+        return not data.is_finite()
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson when available.
+
+    Values orjson does not know, such as Decimal, lazy translation strings
+    and datetimes, go through DRF's encoder, so they render as with
+    JSONRenderer. Floats are valid JSON but may be formatted differently,
+    e.g. 1e-07 as 1e-7. Data orjson cannot encode, such as integers wider
+    than 64 bits, NaN or infinity, goes to JSONRenderer, which raises on
+    the latter like the strict stock renderer. Indented, ASCII-only or
+    non-strict output, and installs without orjson, fall back too.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring."""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or data is None
+            or indent is not None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=encoders.JSONEncoder().default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson writes NaN and infinity as null, so only then look for
+        # them, to raise from the stock renderer instead.
+        if b"null" in ret and has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict JavaScript subset like JSONRenderer.
+        return ret.replace(LINE_SEPARATOR, b"\\u2028").replace(
+            PARAGRAPH_SEPARATOR, b"\\u2029"
+        )
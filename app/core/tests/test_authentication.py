@@ -0,0 +1,154 @@
+"""
+Tests for the cached token authentication backend.
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    LRUCache,
+    invalidate_token,
+    local_cache,
+)
+
+ME_URL = reverse("user:me")
+
+
+def create_user(email="user@example.com", password="test123"):
+    """Create a user with email and password."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class LRUCacheTests(TestCase):
+    """Test the in-process LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache()
+        cache.set("a", 1, ttl=60, max_entries=2)
+        cache.set("b", 2, ttl=60, max_entries=2)
+        cache.get("a")
+        cache.set("c", 3, ttl=60, max_entries=2)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_expired_entries_are_missing(self):
+        cache = LRUCache()
+        cache.set("a", 1, ttl=-1, max_entries=2)
+
+        self.assertIsNone(cache.get("a"))
+
+
+@override_settings(TOKEN_AUTH_CACHE={"LOCAL": True})
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating requests with cached tokens."""
+
+    def setUp(self):
+        local_cache.clear()
+        self.addCleanup(local_cache.clear)
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cached_token_skips_lookup(self):
+        """Test a repeated authentication does not query the database."""
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token.user_id, self.user.pk)
+
+    def test_cached_user_loads_other_fields(self):
+        """Test the cached user still exposes its other fields."""
+        self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_caches_ids_only(self):
+        """Test only the user id and is_active are cached."""
+        self.client.get(ME_URL)
+
+        self.assertEqual(local_cache.get(self.token.key), (self.user.pk, True))
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token is no longer accepted."""
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user is no longer accepted."""
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalidation_waits_for_commit(self):
+        """Test entries are dropped only once the change is committed."""
+        self.client.get(ME_URL)
+        key = self.token.key
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.token.delete()
+            self.assertIsNotNone(local_cache.get(key))
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertIsNone(local_cache.get(key))
+
+    def test_updated_user_not_stale(self):
+        """Test changes to the user are visible on the next request."""
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ME_URL, {"name": "New Name"})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "New Name")
+
+    @override_settings(TOKEN_AUTH_CACHE={"SHARED_CACHE": "default"})
+    def test_shared_cache_is_authoritative(self):
+        """Test stale local entries are ignored with a shared cache."""
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            auth.authenticate_credentials(self.token.key)
+        local_cache.set(self.token.key, (self.user.pk, True), 60, 10)
+        # Another worker deletes the token and invalidates the entry.
+        Token.objects.filter(pk=self.token.pk).delete()
+        invalidate_token(self.token.key)
+        local_cache.set(self.token.key, (self.user.pk, True), 60, 10)
+
+        with self.assertRaises(AuthenticationFailed):
+            auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_AUTH_CACHE={})
+    def test_no_cache_by_default(self):
+        """Test tokens are looked up each time without a configured cache."""
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(1):
+            auth.authenticate_credentials(self.token.key)
@@ -2,12 +2,27 @@
 Test custom management commands.
 """
 
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
-from psycopg2 import OperationalError as Psycopg2Error
+from psycopg import OperationalError as PsycopgError
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from core.management.commands.import_recipes import Importer
+from core.management.commands.uwsgi_config import build_config
+from core.models import Recipe, Tag
 
 
 class CommandTests(SimpleTestCase):
@@ -27,10 +42,400 @@ class CommandTests(SimpleTestCase):
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         """Test waiting for db when db is not ready."""
         patched_check.side_effect = (
-            [Psycopg2Error] * 2 + [OperationalError] * 3 + [True]
+            [PsycopgError] * 2 + [OperationalError] * 3 + [True]
         )
 
         call_command("wait_for_db")
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+    def test_database_driver_is_psycopg3(self):
+        """Test the postgresql backend runs on psycopg 3, as pooling needs."""
+        self.assertEqual(connection.Database.__name__, "psycopg")
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def _jsonl(self, records):
+        return self._write(
+            "recipes.jsonl", "\n".join(json.dumps(r) for r in records)
+        )
+
+    def test_import_jsonl(self):
+        """Test importing recipes with tags and ingredients."""
+        Tag.objects.create(user=self.user, name="Vegan")
+        path = self._jsonl([
+            {
+                "user": "user@example.com",
+                "title": f"Recipe {i}",
+                "time_minutes": 10,
+                "price": "4.50",
+                "tags": ["Vegan", "Quick"],
+                "ingredients": ["Salt"],
+            }
+            for i in range(5)
+        ])
+
+        call_command("import_recipes", path, "--batch-size", "2",
+                     stdout=StringIO())
+
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        for recipe in recipes:
+            self.assertEqual(
+                set(recipe.tags.values_list("name", flat=True)),
+                {"Vegan", "Quick"},
+            )
+            self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV."""
+        path = self._write(
+            "recipes.csv",
+            "user,title,time_minutes,price,tags,ingredients\n"
+            "user@example.com,Soup,20,3.00,Warm;Dinner,Carrot\n",
+        )
+
+        call_command("import_recipes", path, stdout=StringIO())
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, "Soup")
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {"Warm", "Dinner"},
+        )
+
+    def test_import_skips_invalid_records(self):
+        """Test invalid records and unknown users are skipped."""
+        path = self._jsonl([
+            {"user": "user@example.com", "title": "Good",
+             "time_minutes": 5, "price": "1.00"},
+            {"user": "user@example.com", "title": "Bad",
+             "time_minutes": "soon", "price": "1.00"},
+            {"user": "nobody@example.com", "title": "Orphan",
+             "time_minutes": 5, "price": "1.00"},
+            {"user": "user@example.com", "title": "Too expensive",
+             "time_minutes": 5, "price": "1234.00"},
+            {"user": "user@example.com", "title": "Too long",
+             "time_minutes": 10 ** 10, "price": "1.00"},
+            {"user": "user@example.com", "title": "Good too",
+             "time_minutes": 5, "price": "999.99"},
+        ])
+        out = StringIO()
+
+        call_command("import_recipes", path, "--batch-size", "2", stdout=out)
+
+        self.assertEqual(
+            set(Recipe.objects.values_list("title", flat=True)),
+            {"Good", "Good too"},
+        )
+        self.assertIn("Imported 2 recipes, skipped 4.", out.getvalue())
+        self.assertIn("Record 4 skipped: invalid price", out.getvalue())
+
+    def test_import_skips_records_with_wrong_types(self):
+        """Test records with non-string or non-list values are skipped."""
+        good = {"user": "user@example.com", "title": "Good",
+                "time_minutes": 5, "price": "1.00"}
+        path = self._jsonl([
+            {**good, "title": 5},
+            {**good, "user": 1},
+            {**good, "tags": "a;b"},
+            {**good, "ingredients": [1, 2]},
+            {**good, "link": ["x"]},
+            good,
+        ])
+        out = StringIO()
+
+        call_command("import_recipes", path, stdout=out)
+
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertFalse(Tag.objects.exists())
+        self.assertIn("Imported 1 recipes, skipped 5.", out.getvalue())
+        self.assertIn("Record 1 skipped: title must be a string",
+                      out.getvalue())
+        self.assertIn("Record 3 skipped: tags must be a list of strings",
+                      out.getvalue())
+
+    def test_import_skips_malformed_lines(self):
+        """Test lines that are not JSON objects are reported and skipped."""
+        record = json.dumps({"user": "user@example.com", "title": "Good",
+                             "time_minutes": 5, "price": "1.00"})
+        path = self._write(
+            "recipes.jsonl", f"{record}\nnot json\n[1, 2]\n{record}\n"
+        )
+        out = StringIO()
+
+        call_command("import_recipes", path, stdout=out)
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertIn("Record 2 skipped: invalid JSON", out.getvalue())
+        self.assertIn("Record 3 skipped: not a JSON object", out.getvalue())
+        self.assertIn("Imported 2 recipes, skipped 2.", out.getvalue())
+
+    def test_worker_decodes_only_its_lines(self):
+        """Test a worker decodes only the lines of its own batches."""
+        path = self._jsonl([
+            {"user": "user@example.com", "title": f"Recipe {i}",
+             "time_minutes": 5, "price": "1.00"}
+            for i in range(9)
+        ])
+        importer = Importer(path, "jsonl", 1, 3, 2, StringIO())
+
+        with patch(
+            "core.management.commands.import_recipes.json.loads",
+            side_effect=json.loads,
+        ) as patched_loads:
+            importer.run()
+
+        # Worker 1 of 3 owns batches 1 and 4: records 3, 4 and 9.
+        self.assertEqual(patched_loads.call_count, 3)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["Recipe 2", "Recipe 3", "Recipe 8"],
+        )
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test rerunning an import does not duplicate committed records."""
+        records = [
+            {"user": "user@example.com", "title": f"Recipe {i}",
+             "time_minutes": 5, "price": "1.00"}
+            for i in range(3)
+        ]
+        path = self._jsonl(records)
+        call_command("import_recipes", path, stdout=StringIO())
+
+        records.append({"user": "user@example.com", "title": "Recipe 3",
+                        "time_minutes": 5, "price": "1.00"})
+        self._jsonl(records)
+        call_command("import_recipes", path, stdout=StringIO())
+
+        titles = sorted(Recipe.objects.values_list("title", flat=True))
+        self.assertEqual(titles, [f"Recipe {i}" for i in range(4)])
+
+
+class ImportRecipesWorkersTests(TransactionTestCase):
+    """Test the import_recipes command with worker processes."""
+
+    def setUp(self):
+        for email in ("one@example.com", "two@example.com"):
+            get_user_model().objects.create_user(email, "test123")
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "recipes.jsonl")
+
+    def _import(self, count, workers):
+        with open(self.path, "w") as f:
+            for i in range(count):
+                f.write(json.dumps({
+                    "user": ("one", "two")[i % 2] + "@example.com",
+                    "title": f"Recipe {i}",
+                    "time_minutes": 5,
+                    "price": "1.00",
+                    "tags": ["Quick", f"Tag {i % 3}"],
+                }) + "\n")
+        out = StringIO()
+        # Worker processes print progress to their copy of sys.stdout.
+        with patch("sys.stdout", new_callable=StringIO):
+            call_command(
+                "import_recipes", self.path, "--workers", str(workers),
+                "--batch-size", "2", stdout=out,
+            )
+        return out.getvalue()
+
+    def test_import_with_workers(self):
+        """Test workers import every record once, with their tags."""
+        out = self._import(9, workers=3)
+
+        self.assertIn("Imported 9 recipes, skipped 0.", out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            sorted(f"Recipe {i}" for i in range(9)),
+        )
+        self.assertEqual(Tag.objects.filter(name="Quick").count(), 2)
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.tags.count(), 2)
+
+    def test_resume_with_other_worker_count(self):
+        """Test resuming with a different --workers skips committed records."""
+        self._import(7, workers=3)
+
+        out = self._import(10, workers=2)
+
+        self.assertIn("Imported 3 recipes, skipped 0.", out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            sorted(f"Recipe {i}" for i in range(10)),
+        )
+
+
+class BenchmarkSerializersCommandTests(TestCase):
+    """Test the serializer benchmark command."""
+
+    def test_benchmark_reports_identical_output(self):
+        """Test every case is reported and the sample is rolled back."""
+        out = StringIO()
+
+        call_command(
+            "benchmark_serializers", recipes=5, related=2, repeat=1,
+            stdout=out,
+        )
+
+        self.assertEqual(out.getvalue().count("identical output: True"), 3)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchmarkConnectionsCommandTests(TransactionTestCase):
+    """Test the connection benchmark command."""
+
+    def test_benchmark_reports_every_mode(self):
+        """Test each mode is timed and the settings are restored."""
+        settings_dict = connection.settings_dict.copy()
+        out = StringIO()
+
+        call_command("benchmark_connections", requests=2, stdout=out)
+
+        self.assertEqual(out.getvalue().count("ms per request"), 4)
+        self.assertEqual(out.getvalue().count("ms saved"), 3)
+        self.assertIn("pooled: median", out.getvalue())
+        self.assertEqual(connection.settings_dict, settings_dict)
+
+
+class BenchmarkApiCommandTests(TransactionTestCase):
+    """Test the API benchmark command."""
+
+    def test_benchmark_reports_json(self):
+        """Test every endpoint is reported and the sample is deleted."""
+        endpoints = ["list", "detail", "filter", "create", "upload"]
+        out = StringIO()
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    "benchmark_api", users=1, recipes=5, tags=3,
+                    ingredients=3, requests=4, concurrency=2,
+                    endpoint=endpoints, json="-", stdout=out,
+                )
+            uploads = [
+                name for _, _, files in os.walk(media_root) for name in files
+            ]
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(list(report["results"]), endpoints)
+        for result in report["results"].values():
+            self.assertEqual(result["requests"], 4)
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["queries_per_request"], 0)
+        self.assertEqual(report["options"]["concurrency"], 2)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertEqual(uploads, [])
+
+    @patch("core.management.commands.benchmark_api.refresh_list_payloads")
+    def test_failed_seed_is_deleted(self, patched_refresh):
+        """Test users seeded before a failure are deleted."""
+        patched_refresh.side_effect = [None, RuntimeError("seed failed")]
+
+        with self.assertRaises(RuntimeError):
+            call_command(
+                "benchmark_api", users=3, recipes=2, tags=2,
+                ingredients=2, stdout=StringIO(),
+            )
+
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_rejects_non_positive_counts(self):
+        """Test zero or negative counts are refused."""
+        for option in (
+            "--requests", "--concurrency", "--users", "--recipes", "--tags",
+            "--ingredients", "--related",
+        ):
+            for value in ("0", "-1"):
+                with self.subTest(option=option, value=value):
+                    with self.assertRaises(CommandError):
+                        call_command("benchmark_api", option, value)
+
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class UwsgiConfigCommandTests(SimpleTestCase):
+    """Test the uwsgi config command."""
+
+    def test_workers_follow_cpus(self):
+        """Test workers are sized from the CPUs when memory allows."""
+        config = build_config(cpus=2, memory=4096, somaxconn=4096, environ={})
+
+        self.assertEqual(config["workers"], 5)
+        self.assertEqual(config["listen"], 320)
+        self.assertEqual(config["lazy-apps"], "false")
+
+    def test_workers_fit_memory(self):
+        """Test a tight memory limit caps workers and the listen queue."""
+        config = build_config(cpus=8, memory=1024, somaxconn=128, environ={})
+
+        self.assertEqual(config["workers"], 3)
+        self.assertEqual(config["listen"], 128)
+
+    def test_environment_overrides(self):
+        """Test explicit settings win over the computed ones."""
+        environ = {
+            "UWSGI_WORKERS": "2",
+            "UWSGI_THREADS": "4",
+            "UWSGI_RELOAD_ON_RSS": "512",
+        }
+
+        config = build_config(
+            cpus=1, memory=256, somaxconn=4096, environ=environ
+        )
+
+        self.assertEqual(config["workers"], 2)
+        self.assertEqual(config["threads"], 4)
+        self.assertEqual(config["reload-on-rss"], 512)
+
+    def test_empty_environment_values_are_unset(self):
+        """Test empty settings fall back to the computed defaults."""
+        environ = {"UWSGI_WORKERS": "", "UWSGI_THREADS": " "}
+
+        config = build_config(
+            cpus=2, memory=4096, somaxconn=4096, environ=environ
+        )
+
+        self.assertEqual(config["workers"], 5)
+        self.assertEqual(config["threads"], 1)
+
+    def test_streams_outlast_request_harakiri(self):
+        """Test streamed responses get a longer limit than requests."""
+        config = build_config(cpus=1, memory=2048, somaxconn=128, environ={})
+
+        self.assertEqual(config["request-harakiri"], 60)
+        self.assertGreater(config["harakiri"], config["request-harakiri"])
+
+    @patch("core.management.commands.uwsgi_config.memory_limit")
+    @patch("core.management.commands.uwsgi_config.cpu_limit")
+    def test_prints_ini(self, patched_cpu, patched_memory):
+        """Test the command prints an ini section."""
+        patched_cpu.return_value = 1
+        patched_memory.return_value = 2048
+        out = StringIO()
+
+        with patch.dict(os.environ, {}, clear=True):
+            call_command("uwsgi_config", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "[uwsgi]")
+        self.assertIn("workers = 3", lines)
+        self.assertIn("module = app.wsgi", lines)
@@ -0,0 +1,204 @@
+"""
+Tests for recipe image renditions.
+"""
+
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from core import images, models
+
+MEDIA_ROOT = tempfile.mkdtemp()
+ONE_HOUR = timedelta(hours=1)
+
+
+def create_image_file(size=(2000, 1000), name="photo.jpg"):
+    """Return an uploaded JPEG of the given size."""
+    buffer = BytesIO()
+    Image.new("RGB", size, color="red").save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionTests(TestCase):
+    """Test generating downscaled recipe images."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.recipe = models.Recipe.objects.create(
+            user=user,
+            title="Sample",
+            time_minutes=5,
+            price=Decimal("1.00"),
+            image=create_image_file(),
+        )
+
+    def test_create_renditions(self):
+        """Test each size is rendered in every format within bounds."""
+        renditions = images.create_renditions(self.recipe)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, renditions)
+        self.assertEqual(set(renditions), set(images.RENDITION_SIZES))
+        for size_name, size in images.RENDITION_SIZES.items():
+            self.assertEqual(
+                set(renditions[size_name]), set(images.RENDITION_FORMATS)
+            )
+            for path in renditions[size_name].values():
+                with default_storage.open(path) as rendition:
+                    width, height = Image.open(rendition).size
+                self.assertEqual(max(width, height), size)
+
+    def test_create_renditions_replaces_previous(self):
+        """Test rendering again removes the previous files."""
+        old = images.create_renditions(self.recipe)
+        self.recipe.image = create_image_file(name="other.jpg")
+        self.recipe.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            images.create_renditions(self.recipe)
+
+        for formats in old.values():
+            for path in formats.values():
+                self.assertFalse(default_storage.exists(path))
+
+    def test_create_renditions_failure_keeps_previous(self):
+        """Test a failed render leaves the stored renditions in place."""
+        old = images.create_renditions(self.recipe)
+
+        with patch("core.images.ContentFile", side_effect=OSError):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(OSError):
+                    images.create_renditions(self.recipe)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, old)
+        for formats in old.values():
+            for path in formats.values():
+                self.assertTrue(default_storage.exists(path))
+
+    def test_enqueue_renditions_single_pending_job(self):
+        """Test repeated uploads share one pending job."""
+        images.enqueue_renditions(self.recipe)
+        images.enqueue_renditions(self.recipe)
+
+        self.assertEqual(self.recipe.image_jobs.count(), 1)
+        self.assertEqual(self.recipe.image_status, "pending")
+
+    def test_run_job_marks_ready(self):
+        """Test a processed job removes itself and marks the image ready."""
+        images.enqueue_renditions(self.recipe)
+        [job] = images.claim_jobs(limit=5, stale_after=60)
+
+        self.assertTrue(images.run_job(job, max_attempts=3))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, "ready")
+        self.assertFalse(models.ImageJob.objects.exists())
+
+    @patch("core.images.create_renditions", side_effect=OSError("broken"))
+    def test_run_job_retries_then_fails(self, patched_create):
+        """Test failing jobs back off and fail after max attempts."""
+        images.enqueue_renditions(self.recipe)
+        [job] = images.claim_jobs(limit=5, stale_after=60)
+
+        self.assertFalse(images.run_job(job, max_attempts=2))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(images.claim_jobs(limit=5, stale_after=60), [])
+
+        models.ImageJob.objects.update(run_after=timezone.now())
+        [job] = images.claim_jobs(limit=5, stale_after=60)
+        self.assertFalse(images.run_job(job, max_attempts=2))
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("broken", job.last_error)
+        self.assertEqual(self.recipe.image_status, "failed")
+
+    def test_run_job_recipe_deleted(self):
+        """Test a job whose recipe was deleted is dropped."""
+        images.enqueue_renditions(self.recipe)
+        [job] = images.claim_jobs(limit=5, stale_after=60)
+        models.Recipe.objects.filter(pk=self.recipe.pk).delete()
+
+        self.assertFalse(images.run_job(job, max_attempts=3))
+
+        self.assertFalse(models.ImageJob.objects.exists())
+
+    def test_run_job_recipe_deleted_while_rendering(self):
+        """Test a recipe deleted during rendering drops its job."""
+        images.enqueue_renditions(self.recipe)
+        [job] = images.claim_jobs(limit=5, stale_after=60)
+
+        def delete_recipe(recipe):
+            models.Recipe.objects.filter(pk=recipe.pk).delete()
+            raise OSError("gone")
+
+        with patch("core.images.create_renditions", delete_recipe):
+            self.assertFalse(images.run_job(job, max_attempts=3))
+
+        self.assertFalse(models.ImageJob.objects.exists())
+
+    @patch(
+        "core.management.commands.process_images.run_job",
+        side_effect=RuntimeError("boom"),
+    )
+    def test_process_images_survives_job_error(self, patched_run):
+        """Test an unexpected job error does not stop the worker."""
+        images.enqueue_renditions(self.recipe)
+        out = StringIO()
+
+        with self.assertLogs("core.images", level="ERROR"):
+            call_command(
+                "process_images", "--once", "--concurrency", "1", stdout=out
+            )
+
+        patched_run.assert_called_once()
+        self.assertIn("boom", out.getvalue())
+
+    def test_claim_jobs_recovers_stale(self):
+        """Test jobs abandoned while running are claimed again."""
+        images.enqueue_renditions(self.recipe)
+        images.claim_jobs(limit=5, stale_after=60)
+        models.ImageJob.objects.update(locked_at=timezone.now() - ONE_HOUR)
+
+        [job] = images.claim_jobs(limit=5, stale_after=60)
+
+        self.assertEqual(job.attempts, 2)
+
+    def test_claim_jobs_fails_stale_after_max_attempts(self):
+        """Test a job that keeps stopping the worker is not retried."""
+        images.enqueue_renditions(self.recipe)
+        images.claim_jobs(limit=5, stale_after=60, max_attempts=2)
+        models.ImageJob.objects.update(
+            attempts=2, locked_at=timezone.now() - ONE_HOUR
+        )
+
+        jobs = images.claim_jobs(limit=5, stale_after=60, max_attempts=2)
+
+        self.assertEqual(jobs, [])
+        job = models.ImageJob.objects.get()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(self.recipe.image_status, "failed")
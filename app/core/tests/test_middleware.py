@@ -0,0 +1,139 @@
+"""
+Tests for the request timing middleware.
+"""
+
+import asyncio
+import re
+from unittest.mock import Mock, patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, force_authenticate
+
+from core.middleware import RequestHarakiriMiddleware, RequestTimingMiddleware
+from core.models import Tag
+from recipe.views import TagViewSet
+
+TAGS_URL = reverse("recipe:tag-list")
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", view;dur=[\d.]+, '
+    r"render;dur=[\d.]+, total;dur=[\d.]+"
+)
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    """Test per-request timings."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123"
+        )
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Test responses report their queries and phases."""
+        res = self.client.get(TAGS_URL)
+
+        match = SERVER_TIMING.fullmatch(res.headers["Server-Timing"])
+        self.assertIsNotNone(match)
+        self.assertGreater(int(match.group(1)), 0)
+
+    def test_logs_request(self):
+        """Test each request is logged with its timings."""
+        with self.assertLogs("core.middleware", "INFO") as logs:
+            self.client.get(TAGS_URL)
+
+        record = logs.records[0]
+        self.assertEqual(record.levelname, "INFO")
+        self.assertEqual(record.endpoint, "recipe:tag-list")
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.queries, 0)
+        self.assertIn("queries=", record.getMessage())
+
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_warns_over_query_budget(self):
+        """Test requests over the query budget are logged as warnings."""
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(logs.records[0].levelname, "WARNING")
+        self.assertIn("over_budget=true", logs.records[0].getMessage())
+
+    async def test_async_request(self):
+        """Test timings are collected when served by the ASGI handler."""
+        token = await Token.objects.acreate(user=self.user)
+
+        res = await AsyncClient().get(
+            TAGS_URL, headers={"authorization": f"Token {token}"}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        match = SERVER_TIMING.fullmatch(res.headers["Server-Timing"])
+        self.assertGreater(int(match.group(1)), 0)
+
+    @override_settings(ASYNC_API=True)
+    async def test_async_view_queries(self):
+        """Test queries run by the async read views are all counted."""
+        # URL patterns build their views at import, before the settings
+        # override, so the async view is built and wrapped here.
+        view = TagViewSet.as_view({"get": "list"})
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        middleware = RequestTimingMiddleware(view)
+        request = AsyncRequestFactory().get("/")
+        force_authenticate(request, self.user)
+        # The ORM runs queries on the connection of the sync thread.
+        queries = CaptureQueriesContext(connection)
+        await sync_to_async(queries.__enter__)()
+        try:
+            res = await middleware(request)
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+        executed = await sync_to_async(len)(queries)
+
+        self.assertEqual(res.data["results"][0]["name"], "Vegan")
+        match = SERVER_TIMING.fullmatch(res.headers["Server-Timing"])
+        self.assertEqual(int(match.group(1)), executed)
+        self.assertGreater(executed, 0)
+
+
+class RequestHarakiriMiddlewareTests(SimpleTestCase):
+    """Test the per-request uwsgi time limit."""
+
+    def _call(self, response):
+        uwsgi = Mock(opt={"request-harakiri": b"60"})
+        with patch("core.middleware.uwsgi", uwsgi):
+            middleware = RequestHarakiriMiddleware(lambda request: response)
+            middleware(RequestFactory().get("/"))
+        return [call.args for call in uwsgi.set_user_harakiri.call_args_list]
+
+    def test_limits_requests(self):
+        """Test each request is given the request-harakiri limit."""
+        self.assertEqual(self._call(HttpResponse()), [(60,)])
+
+    def test_streams_are_exempt(self):
+        """Test the limit is lifted for streamed responses."""
+        response = StreamingHttpResponse(iter([b"{}"]))
+
+        self.assertEqual(self._call(response), [(60,), (0,)])
+
+    def test_unused_outside_uwsgi(self):
+        """Test the middleware is dropped when not served by uwsgi."""
+        with patch("core.middleware.uwsgi", None):
+            with self.assertRaises(MiddlewareNotUsed):
+                RequestHarakiriMiddleware(lambda request: HttpResponse())
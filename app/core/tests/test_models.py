@@ -2,8 +2,10 @@
 Tests for models
 """
 
+from unittest import skipUnless
 from unittest.mock import patch
 from decimal import Decimal
+from django.db import connection, IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -81,3 +83,97 @@ class ModelTests(TestCase):
         file_path = models.recipe_image_file_path(None, "myimage.jpg")
         exp_path = f"uploads/recipe/{uuid}.jpg"
         self.assertEqual(file_path, exp_path)
+
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name="Vegan")
+        other = create_user(email="other@example.com")
+        models.Tag.objects.create(user=other, name="Vegan")
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Vegan")
+
+    def test_ingredient_name_unique_per_user(self):
+        """Test a user cannot have two ingredients with the same name."""
+        user = create_user()
+        models.Ingredient.objects.create(user=user, name="Salt")
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name="Salt")
+
+
+class IndexTests(TestCase):
+    """Test the per-user access paths are indexed."""
+
+    def _index_columns(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return [
+            c["columns"]
+            for c in constraints.values()
+            if c["index"] or c["unique"]
+        ]
+
+    def test_recipe_user_id_index(self):
+        """Test recipes are indexed by user then id."""
+        columns = self._index_columns(models.Recipe)
+        self.assertIn(["user_id", "id"], columns)
+
+    def test_tag_and_ingredient_user_name_index(self):
+        """Test tags and ingredients are indexed by user then name."""
+        for model in (models.Tag, models.Ingredient):
+            columns = self._index_columns(model)
+            self.assertIn(["user_id", "name"], columns)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_recipe_list_query_uses_index(self):
+        """Test the recipe list query is planned as an index scan."""
+        # 10k rows, a tenth of them the user's: enough for the planner to
+        # prefer the index over a scan, and still fast to seed.
+        user = create_user()
+        other = create_user(email="other@example.com")
+        models.Recipe.objects.bulk_create(
+            models.Recipe(
+                user=user if i % 10 == 0 else other,
+                title=f"Recipe {i}",
+                time_minutes=5,
+                price=Decimal("1.00"),
+            )
+            for i in range(10000)
+        )
+        queryset = models.Recipe.objects.filter(user=user).order_by("-id")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE core_recipe")
+            plan = queryset[:50].explain()
+
+        self.assertIn("recipe_user_id_desc_idx", plan)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_tag_and_ingredient_list_queries_use_index(self):
+        """Test the tag and ingredient list queries use the name index."""
+        user = create_user()
+        other = create_user(email="other@example.com")
+        for model, index in (
+            (models.Tag, "unique_tag_user_name"),
+            (models.Ingredient, "unique_ingredient_user_name"),
+        ):
+            with self.subTest(model=model.__name__):
+                model.objects.bulk_create(
+                    model(
+                        user=user if i % 10 == 0 else other,
+                        name=f"{model.__name__} {i}",
+                    )
+                    for i in range(10000)
+                )
+                # Filtered, ordered and paged like the list views.
+                queryset = (
+                    model.objects.filter(user=user)
+                    .order_by("-name", "-id")
+                    .values("id", "name")
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")
+                    plan = queryset[:101].explain()
+
+                self.assertIn(index, plan)
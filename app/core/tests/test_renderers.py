@@ -0,0 +1,111 @@
+"""
+Tests for the JSON renderer and parser.
+"""
+
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE = {
+    "price": Decimal("5.25"),
+    "created": datetime.datetime(
+        2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    ),
+    "day": datetime.date(2024, 5, 1),
+    "at": datetime.time(9, 15, 30, 500),
+    "label": gettext_lazy("Recipe"),
+    "key": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "nested": [{"id": 1, "name": "Café\u2028\u2029"}],
+    1: "integer key",
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the orjson-backed renderer."""
+
+    def test_matches_json_renderer(self):
+        """Test output matches the stock renderer for non-float values."""
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE)
+        )
+
+    def test_fallback_without_orjson(self):
+        """Test the stock renderer is used when orjson is missing."""
+        with patch("core.renderers.orjson", None):
+            rendered = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(rendered, JSONRenderer().render(SAMPLE))
+
+    def test_indent_falls_back(self):
+        """Test indented output is rendered like the stock renderer."""
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_render_none(self):
+        """Test rendering no data returns an empty body."""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_non_finite_numbers_raise(self):
+        """Test NaN and infinity are rejected like the stock renderer."""
+        for value in (
+            float("nan"), float("inf"), float("-inf"), Decimal("NaN")
+        ):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({"items": [None, value]})
+
+    def test_wide_integers(self):
+        """Test integers wider than 64 bits render like the stdlib."""
+        data = {"big": 2 ** 64, "small": -(2 ** 70), "id": None}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_unserializable_raises(self):
+        """Test unknown types raise like the stock renderer."""
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"value": object()})
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the orjson-backed parser."""
+
+    def test_matches_json_parser(self):
+        """Test parsed data is identical to the stock parser."""
+        body = '{"title": "Café", "price": 5.25, "tags": [{"a": null}]}'
+
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(body.encode())),
+            JSONParser().parse(BytesIO(body.encode())),
+        )
+
+    def test_invalid_json(self):
+        """Test malformed bodies raise a parse error."""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title": '))
+
+    def test_other_encoding_falls_back(self):
+        """Test non UTF-8 bodies are decoded by the stock parser."""
+        body = '{"title": "Café"}'.encode("latin-1")
+
+        data = FastJSONParser().parse(
+            BytesIO(body), parser_context={"encoding": "latin-1"}
+        )
+
+        self.assertEqual(data, {"title": "Café"})
@@ -0,0 +1,104 @@
+"""
+Async read path for the recipe API under ASGI.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Serve list and retrieve with async handlers when ASYNC_API is set.
+
+    The view returned by as_view becomes a coroutine function. GET
+    requests for the actions in async_actions go through adispatch,
+    which runs the a<action> handlers and fetches rows with the async
+    ORM. Other requests run the regular sync view in a thread.
+    Authentication and permission checks run in a thread too, as they
+    may hit the database.
+    """
+
+    async_actions = ("list", "retrieve")
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not getattr(settings, "ASYNC_API", False) or not any(
+            action in cls.async_actions for action in actions.values()
+        ):
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            action = actions.get(request.method.lower())
+            if request.method != "GET" or action not in cls.async_actions:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, name in actions.items():
+                setattr(self, method, getattr(self, name))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        async_view.__name__ = view.__name__
+        async_view.__doc__ = view.__doc__
+        async_view.__dict__.update(view.__dict__)
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Async counterpart of APIView.dispatch for GET requests"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def aprepare_page(self, page):
+        """Hook to load what serializing the page needs from the database"""
+
+    async def alist(self, request, *args, **kwargs):
+        """Async counterpart of ListModelMixin.list"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(
+            queryset, request, view=self
+        )
+        await self.aprepare_page(page)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    async def aget_object(self):
+        """Async counterpart of GenericAPIView.get_object"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (
+            queryset.model.DoesNotExist, TypeError, ValueError, ValidationError
+        ):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """Async counterpart of RetrieveModelMixin.retrieve"""
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
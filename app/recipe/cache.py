@@ -0,0 +1,158 @@
+"""
+Per-user response caching for the recipe app.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_cache():
+    """Return the configured response cache or None when disabled."""
+    alias = getattr(settings, "RESPONSE_CACHE", {}).get("ALIAS")
+    return caches[alias] if alias else None
+
+
+def _generation_key(user_id):
+    return f"recipe-gen:{user_id}"
+
+
+def get_generation(cache, user_id):
+    """Return the current cache generation for a user."""
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so an evicted counter never restarts at a
+        # value that older entries were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+async def aget_generation(cache, user_id):
+    """Return the current cache generation for a user, asynchronously."""
+    key = _generation_key(user_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def bump_generation(user_id):
+    """Invalidate every cached response for a user."""
+    cache = get_cache()
+    if cache is None:
+        return
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+class ResponseCacheMixin:
+    """Cache list responses per user and answer conditional requests.
+
+    Entries are keyed by user, generation, endpoint and the normalized
+    query string. Any write made through the viewset bumps the user's
+    generation, so older entries and ETags stop matching.
+    """
+
+    def _list_cache_key(self, request, generation):
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return ":".join([
+            "recipe-list",
+            str(request.user.id),
+            str(generation),
+            request.build_absolute_uri(request.path),
+            params,
+        ])
+
+    def _etag(self, key):
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+    def _not_modified(self, request, etag):
+        if etag not in parse_etags(request.headers.get("If-None-Match", "")):
+            return None
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return self._finalize_cached(response, etag)
+
+    def _finalize_cached(self, response, etag):
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def _ttl(self):
+        return getattr(settings, "RESPONSE_CACHE", {}).get("TTL", 300)
+
+    def list(self, request, *args, **kwargs):
+        """Return the list response, served from cache when possible"""
+        cache = get_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+
+        key = self._list_cache_key(
+            request, get_generation(cache, request.user.id)
+        )
+        etag = self._etag(key)
+        not_modified = self._not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, self._ttl())
+        return self._finalize_cached(Response(data), etag)
+
+    async def alist(self, request, *args, **kwargs):
+        """Async counterpart of list for the ASGI read path"""
+        cache = get_cache()
+        if cache is None:
+            return await super().alist(request, *args, **kwargs)
+
+        key = self._list_cache_key(
+            request, await aget_generation(cache, request.user.id)
+        )
+        etag = self._etag(key)
+        not_modified = self._not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = await cache.aget(key)
+        if data is None:
+            response = await super().alist(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            await cache.aset(key, data, self._ttl())
+        return self._finalize_cached(Response(data), etag)
+
+    def invalidate_cache(self):
+        """Bump the user's generation once the write is committed"""
+        user_id = self.request.user.id
+        transaction.on_commit(lambda: bump_generation(user_id))
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.invalidate_cache()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.invalidate_cache()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_cache()
@@ -0,0 +1,63 @@
+"""
+Pagination classes for the recipe app.
+"""
+
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
+
+
+class AsyncCursorPagination(CursorPagination):
+    """Cursor pagination that can also be awaited from async views"""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Return the page, fetched without blocking the event loop
+
+        The async ORM runs queries with sync_to_async in the same thread,
+        so running paginate_queryset there reuses DRF's cursor handling.
+        """
+        return await sync_to_async(self.paginate_queryset)(
+            queryset, request, view
+        )
+
+
+class RecipeCursorPagination(AsyncCursorPagination):
+    """Keyset pagination for recipes ordered by newest first"""
+
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """Page search results by rank, then newest first"""
+        if request.query_params.get("search"):
+            return ("-rank", "-id")
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(AsyncCursorPagination):
+    """Keyset pagination for tags and ingredients ordered by name"""
+
+    ordering = ("-name", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    typeahead_page_size = 10
+    typeahead_max_page_size = 50
+
+    def get_ordering(self, request, queryset, view):
+        """Page typeahead results by rank and usage by recipe count"""
+        if request.query_params.get("q", "").strip():
+            return ("-rank", "-id")
+        if request.query_params.get("ordering") == "usage":
+            return ("-recipe_count", "-id")
+        return super().get_ordering(request, queryset, view)
+
+    def get_page_size(self, request):
+        """Cap typeahead pages to a handful of suggestions"""
+        if not request.query_params.get("q", "").strip():
+            return super().get_page_size(request)
+        page_size = super().get_page_size(request)
+        if self.page_size_query_param not in request.query_params:
+            page_size = self.typeahead_page_size
+        return min(page_size, self.typeahead_max_page_size)
@@ -2,34 +2,246 @@
 Serializers for the Recipe app.
 """
 
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
 from rest_framework import serializers
 
-from core.models import Recipe, Tag, Ingredient
+from core.images import enqueue_renditions
+from core.models import Recipe, RecipeListPayload, Tag, Ingredient
 
 
-class TagSerializer(serializers.ModelSerializer):
+def rendition_urls(renditions, request=None):
+    """Return rendition URLs keyed by size and format"""
+    urls = {}
+    for size_name, formats in renditions.items():
+        urls[size_name] = {}
+        for ext, path in formats.items():
+            url = default_storage.url(path)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[size_name][ext] = url
+    return urls
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Expose stored image renditions as URLs keyed by size and format"""
+
+    def to_representation(self, value):
+        return rendition_urls(value, self.context.get("request"))
+
+
+# Shared instance so fast read paths format prices exactly like DRF.
+PRICE_FIELD = serializers.DecimalField(
+    max_digits=Recipe._meta.get_field("price").max_digits,
+    decimal_places=Recipe._meta.get_field("price").decimal_places,
+)
+
+
+def image_url(image, request=None):
+    """Return the image URL the way ImageField represents it"""
+    if not image:
+        return None
+    url = image.url
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return url
+
+
+class RecipeCountMixin(serializers.Serializer):
+    """Add the annotated recipe_count when the view asks for it"""
+
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get("with_counts"):
+            fields.pop("recipe_count")
+        return fields
+
+
+class UniqueNameMixin:
+    """Reject renaming a tag or ingredient to a name the user already has
+
+    Nested under a recipe, names are resolved to existing rows instead.
+    """
+
+    def validate_name(self, value):
+        if self.parent is not None:
+            return value
+        others = self.Meta.model.objects.filter(
+            user=self.context["request"].user, name=value
+        )
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError(
+                f"A {self.Meta.model._meta.verbose_name} with this name "
+                "already exists."
+            )
+        return value
+
+
+class TagSerializer(
+    UniqueNameMixin, RecipeCountMixin, serializers.ModelSerializer
+):
     """Serializer for tag objects"""
 
     class Meta:
         model = Tag
-        fields = ["id", "name"]
+        fields = ["id", "name", "recipe_count"]
         read_only_fields = ["id"]
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    UniqueNameMixin, RecipeCountMixin, serializers.ModelSerializer
+):
     """Serializer for ingredient objects"""
 
     class Meta:
         model = Ingredient
-        fields = ["id", "name"]
+        fields = ["id", "name", "recipe_count"]
         read_only_fields = ["id"]
 
 
+class NameReadMixin:
+    """Fast read path for lists of .values() rows with id and name"""
+
+    def to_representation(self, instance):
+        data = {"id": instance["id"], "name": instance["name"]}
+        if self.context.get("with_counts"):
+            data["recipe_count"] = instance["recipe_count"]
+        return data
+
+
+class TagReadSerializer(NameReadMixin, TagSerializer):
+    """Read-only tag serializer for list responses"""
+
+
+class IngredientReadSerializer(NameReadMixin, IngredientSerializer):
+    """Read-only ingredient serializer for list responses"""
+
+
+def _names(related):
+    return [{"id": item.id, "name": item.name} for item in related.all()]
+
+
+def recipe_payload(recipe):
+    """Return the stored list fields of a recipe as a plain dict"""
+    return {
+        "id": recipe.id,
+        "title": recipe.title,
+        "time_minutes": recipe.time_minutes,
+        "price": PRICE_FIELD.to_representation(recipe.price),
+        "link": recipe.link,
+        "tags": _names(recipe.tags),
+        "ingredients": _names(recipe.ingredients),
+    }
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Create and update many recipes with bulk queries"""
+
+    def _resolve_names(self, model, items_per_recipe):
+        """Return the ids of every item's name, creating missing rows"""
+        names = list(dict.fromkeys(
+            item["name"] for items in items_per_recipe for item in items
+        ))
+        ids = self.child._get_or_create_names(
+            model, [{"name": name} for name in names]
+        )
+        ids_by_name = dict(zip(names, ids))
+        return [
+            [ids_by_name[item["name"]] for item in items]
+            for items in items_per_recipe
+        ]
+
+    def _link_names(self, model, field_name, recipes, items_per_recipe):
+        ids_per_recipe = self._resolve_names(model, items_per_recipe)
+        self.child._add_links(field_name, [
+            (recipe.id, pk)
+            for recipe, ids in zip(recipes, ids_per_recipe)
+            for pk in ids
+        ])
+
+    def _set_names(self, model, field_name, recipes, items_per_recipe):
+        """Write only the through rows that differ, for every recipe"""
+        wanted = dict(zip(
+            [recipe.id for recipe in recipes],
+            self._resolve_names(model, items_per_recipe),
+        ))
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        column, reverse = field.m2m_column_name(), field.m2m_reverse_name()
+        current = {}
+        for recipe_id, pk in through.objects.filter(
+            **{f"{column}__in": wanted}
+        ).values_list(column, reverse):
+            current.setdefault(recipe_id, set()).add(pk)
+        removed = Q()
+        for recipe_id, ids in wanted.items():
+            stale = current.get(recipe_id, set()) - set(ids)
+            if stale:
+                removed |= Q(**{column: recipe_id, f"{reverse}__in": stale})
+        if removed:
+            through.objects.filter(removed).delete()
+        self.child._add_links(field_name, [
+            (recipe_id, pk)
+            for recipe_id, ids in wanted.items()
+            for pk in ids
+            if pk not in current.get(recipe_id, ())
+        ])
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create the recipes, their tags and ingredients in bulk"""
+        tags = [item.pop("tags", []) for item in validated_data]
+        ingredients = [item.pop("ingredients", []) for item in validated_data]
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**item) for item in validated_data]
+        )
+        self._link_names(Tag, "tags", recipes, tags)
+        self._link_names(Ingredient, "ingredients", recipes, ingredients)
+        refresh_list_payloads([recipe.id for recipe in recipes])
+        return recipes
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Apply validated changes to a list of recipes in bulk
+
+        instance is the list of recipes and validated_data the list of
+        their changes, in the same order.
+        """
+        related = {"tags": [], "ingredients": []}
+        by_fields = {}
+        for recipe, data in zip(instance, validated_data):
+            data = dict(data)
+            for field_name, changes in related.items():
+                items = data.pop(field_name, None)
+                if items is not None:
+                    changes.append((recipe, items))
+            for attr, value in data.items():
+                setattr(recipe, attr, value)
+            if data:
+                by_fields.setdefault(tuple(sorted(data)), []).append(recipe)
+        # Recipes changing the same fields share one UPDATE, so fields a
+        # recipe did not change are never written back.
+        for fields, recipes in by_fields.items():
+            Recipe.objects.bulk_update(recipes, fields)
+        for model, field_name in ((Tag, "tags"), (Ingredient, "ingredients")):
+            if related[field_name]:
+                recipes, items = zip(*related[field_name])
+                self._set_names(model, field_name, recipes, items)
+        refresh_list_payloads([recipe.id for recipe in instance])
+        return instance
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipe objects"""
 
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -41,25 +253,86 @@ class RecipeSerializer(serializers.ModelSerializer):
             "link",
             "tags",
             "ingredients",
+            "image_renditions",
+            "image_status",
         ]
-        read_only_fields = ["id"]
+        read_only_fields = ["id", "image_status"]
+        list_serializer_class = RecipeListSerializer
+
+    def _get_or_create_names(self, model, items):
+        """Resolve names to ids for the user, creating missing rows"""
+        auth_user = self.context["request"].user
+        names = list(dict.fromkeys(item["name"] for item in items))
+        if not names:
+            return []
+        ids_by_name = dict(
+            model.objects.filter(user=auth_user, name__in=names)
+            .values_list("name", "id")
+        )
+        missing = [name for name in names if name not in ids_by_name]
+        if missing:
+            # Rows created concurrently by another request are skipped
+            # by the (user, name) constraint and picked up below.
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            ids_by_name.update(
+                model.objects.filter(user=auth_user, name__in=missing)
+                .values_list("name", "id")
+            )
+        return [ids_by_name[name] for name in names]
+
+    def _add_links(self, field_name, pairs):
+        """Insert through rows for (recipe id, related id) pairs"""
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        through.objects.bulk_create(
+            [
+                through(**{
+                    field.m2m_column_name(): recipe_id,
+                    field.m2m_reverse_name(): pk,
+                })
+                for recipe_id, pk in pairs
+            ],
+            ignore_conflicts=True,
+        )
+
+    def _add_related(self, recipe, field_name, ids):
+        """Insert the through rows linking the recipe to the given ids"""
+        self._add_links(field_name, [(recipe.id, pk) for pk in ids])
 
     def _get_or_create_tags(self, tags, recipe):
         """Create or get tags and associate them with the recipe"""
-        auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
+        tag_ids = self._get_or_create_names(Tag, tags)
+        self._add_related(recipe, "tags", tag_ids)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Create or get ingredients and associate them with the recipe"""
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_ids = self._get_or_create_names(Ingredient, ingredients)
+        self._add_related(recipe, "ingredients", ingredient_ids)
 
+    def _set_related(self, recipe, field_name, ids):
+        """Write only the through rows that differ from the given ids"""
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        links = through.objects.filter(
+            **{field.m2m_column_name(): recipe.id}
+        )
+        current = set(
+            links.values_list(field.m2m_reverse_name(), flat=True)
+        )
+        wanted = set(ids)
+        removed = current - wanted
+        if removed:
+            links.filter(
+                **{f"{field.m2m_reverse_name()}__in": removed}
+            ).delete()
+        self._add_related(
+            recipe, field_name, [pk for pk in ids if pk not in current]
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop("tags", [])
@@ -67,25 +340,128 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
+        refresh_list_payloads([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a recipe"""
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_related(
+                instance,
+                "ingredients",
+                self._get_or_create_names(Ingredient, ingredients),
+            )
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_related(
+                instance, "tags", self._get_or_create_names(Tag, tags)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        # Only the changed columns, so image fields written by the image
+        # worker meanwhile are not overwritten with stale values.
+        instance.save(update_fields=list(validated_data))
+        refresh_list_payloads([instance.id])
         return instance
 
 
+class RecipePayloadSerializer(RecipeSerializer):
+    """Serializer rendering the stored part of the recipe list payload"""
+
+    class Meta(RecipeSerializer.Meta):
+        fields = [
+            name for name in RecipeSerializer.Meta.fields
+            if name not in ("image_renditions", "image_status")
+        ]
+
+    def to_representation(self, instance):
+        return recipe_payload(instance)
+
+
+def refresh_list_payloads(recipe_ids):
+    """Render, store and return the list payloads of the given recipes.
+
+    The recipe rows stay locked until the payloads are stored, so a
+    concurrent write expiring them waits instead of being overwritten.
+    Payloads that did not change are not written again.
+    """
+    with transaction.atomic():
+        recipes = (
+            Recipe.objects.select_for_update(of=("self",))
+            .filter(id__in=recipe_ids)
+            .order_by("id")
+            .select_related("list_payload")
+            .prefetch_related("tags", "ingredients")
+        )
+        payloads = {}
+        changed = []
+        for recipe in recipes:
+            payload = RecipePayloadSerializer(recipe).data
+            payloads[recipe.id] = payload
+            stored = getattr(recipe, "list_payload", None)
+            if stored is None or stored.payload != payload:
+                changed.append(
+                    RecipeListPayload(recipe_id=recipe.id, payload=payload)
+                )
+        RecipeListPayload.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["recipe"],
+            update_fields=["payload"],
+        )
+    return payloads
+
+
+def fill_list_payloads(recipes):
+    """Attach payloads to recipes loaded without one, rendering them"""
+    stale = [
+        recipe.id for recipe in recipes
+        if getattr(recipe, "list_payload", None) is None
+    ]
+    if not stale:
+        return
+    payloads = refresh_list_payloads(stale)
+    for recipe in recipes:
+        if recipe.id in payloads:
+            recipe.list_payload = RecipeListPayload(
+                recipe=recipe, payload=payloads[recipe.id]
+            )
+
+
+class StoredRecipeListSerializer(serializers.ListSerializer):
+    """Render a page of recipes, storing missing payloads in one go"""
+
+    def to_representation(self, data):
+        recipes = list(data)
+        fill_list_payloads(recipes)
+        return [
+            self.child.to_representation(recipe) for recipe in recipes
+            if getattr(recipe, "list_payload", None) is not None
+        ]
+
+
+class StoredRecipeSerializer(serializers.BaseSerializer):
+    """Read-only recipe list representation built from stored payloads
+
+    Expects recipes loaded with select_related("list_payload"); the
+    output matches RecipeSerializer without touching tags or ingredients.
+    """
+
+    class Meta:
+        list_serializer_class = StoredRecipeListSerializer
+
+    def to_representation(self, instance):
+        data = dict(instance.list_payload.payload)
+        data["image_renditions"] = rendition_urls(
+            instance.image_renditions, self.context.get("request")
+        )
+        data["image_status"] = instance.image_status
+        return {name: data[name] for name in RecipeSerializer.Meta.fields}
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view"""
 
@@ -93,15 +469,106 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ["description", "image"]
 
 
+class RecipeDetailReadSerializer(RecipeDetailSerializer):
+    """Read-only recipe detail serializer building plain dicts"""
+
+    def to_representation(self, instance):
+        request = self.context.get("request")
+        data = recipe_payload(instance)
+        data["image_renditions"] = rendition_urls(
+            instance.image_renditions, request
+        )
+        data["image_status"] = instance.image_status
+        data["description"] = instance.description
+        data["image"] = image_url(instance.image, request)
+        return data
+
+
+class RecipeSparseSerializer(RecipeDetailSerializer):
+    """Read-only recipe serializer limited to the requested fields
+
+    context["fields"] names the fields to render, in order, and
+    context["expand"] the related fields rendered as objects rather
+    than lists of ids. Only the named fields are read from the recipe.
+    """
+
+    def to_representation(self, instance):
+        request = self.context.get("request")
+        expand = self.context["expand"]
+        data = {}
+        for name in self.context["fields"]:
+            if name in ("tags", "ingredients"):
+                related = getattr(instance, name)
+                data[name] = (
+                    _names(related) if name in expand
+                    else [item.id for item in related.all()]
+                )
+            elif name == "price":
+                data[name] = PRICE_FIELD.to_representation(instance.price)
+            elif name == "image_renditions":
+                data[name] = rendition_urls(instance.image_renditions, request)
+            elif name == "image":
+                data[name] = image_url(instance.image, request)
+            else:
+                data[name] = getattr(instance, name)
+        return data
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    """Serializer for batches of recipe writes"""
+
+    max_items = 500
+
+    create = serializers.ListField(
+        child=serializers.DictField(), required=False, default=list
+    )
+    update = serializers.ListField(
+        child=serializers.DictField(), required=False, default=list
+    )
+    delete = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+    def validate_update(self, value):
+        """Require a distinct integer id for every recipe to update"""
+        ids = [item.get("id") for item in value]
+        # JSON true and false load as bool, a subclass of int.
+        if any(isinstance(pk, bool) or not isinstance(pk, int) for pk in ids):
+            raise serializers.ValidationError(
+                "Every update requires an integer id."
+            )
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError(
+                "Each recipe may be updated only once per batch."
+            )
+        return value
+
+    def validate(self, attrs):
+        total = sum(len(attrs[key]) for key in ("create", "update", "delete"))
+        if total > self.max_items:
+            raise serializers.ValidationError(
+                f"A batch may contain at most {self.max_items} items."
+            )
+        return attrs
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
-        read_only_fields = ["id"]
+        fields = ["id", "image", "image_renditions", "image_status"]
+        read_only_fields = ["id", "image_status"]
         extra_kwargs = {
             "image": {
                 "required": True,
             }
         }
+
+    def update(self, instance, validated_data):
+        """Store the uploaded image and queue rendering its copies"""
+        instance = super().update(instance, validated_data)
+        enqueue_renditions(instance)
+        return instance
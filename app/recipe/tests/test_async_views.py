@@ -0,0 +1,144 @@
+"""
+Tests for the async read path.
+"""
+
+import asyncio
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import force_authenticate
+
+from core.models import Recipe, RecipeListPayload, Tag
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet, TagViewSet
+
+RECIPE_ACTIONS = {"get": "list", "post": "create"}
+DETAIL_ACTIONS = {"get": "retrieve", "patch": "partial_update"}
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        "title": "Sample Recipe",
+        "time_minutes": 10,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(ASYNC_API=True)
+class AsyncViewTests(TestCase):
+    """Test list and retrieve served by async views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123"
+        )
+        self.factory = AsyncRequestFactory()
+
+    async def _call(self, view, request, **kwargs):
+        force_authenticate(request, self.user)
+        response = await view(request, **kwargs)
+        return await sync_to_async(response.render)()
+
+    def test_views_are_async_only_when_enabled(self):
+        """Test as_view returns a coroutine function only with ASYNC_API"""
+        view = RecipeViewSet.as_view(RECIPE_ACTIONS)
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertEqual(view.actions, RECIPE_ACTIONS)
+
+        with self.settings(ASYNC_API=False):
+            view = RecipeViewSet.as_view(RECIPE_ACTIONS)
+        self.assertFalse(asyncio.iscoroutinefunction(view))
+
+    async def test_list_recipes(self):
+        """Test the async list matches the serializer and stores payloads"""
+        tag = await Tag.objects.acreate(user=self.user, name="Vegan")
+        recipe = await sync_to_async(create_recipe)(self.user)
+        await recipe.tags.aadd(tag)
+        view = RecipeViewSet.as_view(RECIPE_ACTIONS)
+
+        res = await self._call(view, self.factory.get("/"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe = await Recipe.objects.prefetch_related(
+            "tags", "ingredients"
+        ).aget(id=recipe.id)
+        self.assertEqual(
+            res.data["results"], [RecipeSerializer(recipe).data]
+        )
+        self.assertTrue(
+            await RecipeListPayload.objects.filter(recipe=recipe).aexists()
+        )
+
+    async def test_list_recipes_paginated(self):
+        """Test the async list follows cursor pages"""
+        for i in range(3):
+            await sync_to_async(create_recipe)(self.user, title=f"R{i}")
+        view = RecipeViewSet.as_view(RECIPE_ACTIONS)
+
+        res = await self._call(view, self.factory.get("/", {"page_size": 2}))
+        titles = [r["title"] for r in res.data["results"]]
+        res = await self._call(view, self.factory.get(res.data["next"]))
+        titles.extend(r["title"] for r in res.data["results"])
+
+        self.assertEqual(titles, ["R2", "R1", "R0"])
+
+    async def test_retrieve_recipe(self):
+        """Test the async detail and its 404"""
+        recipe = await sync_to_async(create_recipe)(self.user)
+        view = RecipeViewSet.as_view(DETAIL_ACTIONS)
+
+        res = await self._call(view, self.factory.get("/"), pk=recipe.id)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["title"], recipe.title)
+
+        res = await self._call(view, self.factory.get("/"), pk=recipe.id + 1)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_writes_use_sync_view(self):
+        """Test other methods still run the sync handlers"""
+        view = RecipeViewSet.as_view(RECIPE_ACTIONS)
+        payload = {"title": "Soup", "time_minutes": 5, "price": "2.00"}
+
+        res = await self._call(
+            view,
+            self.factory.post("/", payload, content_type="application/json"),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Recipe.objects.filter(title="Soup").aexists())
+
+    async def test_export_streams_asynchronously(self):
+        """Test exports stream through an async iterator under ASGI"""
+        await sync_to_async(create_recipe)(self.user, title="Soup")
+        view = RecipeViewSet.as_view({"get": "export"})
+        request = self.factory.get("/")
+        force_authenticate(request, self.user)
+
+        response = await sync_to_async(view)(request)
+
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response])
+        self.assertEqual(json.loads(body)["title"], "Soup")
+
+    async def test_list_tags_invalid_params(self):
+        """Test validation errors are returned by the async path"""
+        view = TagViewSet.as_view({"get": "list"})
+
+        res = await self._call(view, self.factory.get("/", {"ordering": "x"}))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_list_requires_auth(self):
+        """Test the async path checks authentication"""
+        view = TagViewSet.as_view({"get": "list"})
+
+        res = await view(self.factory.get("/"))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
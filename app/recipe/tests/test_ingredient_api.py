@@ -62,7 +62,7 @@ class PrivateIngredientAPITests(TestCase):
         ingredients = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test list of ingredients is limited to authenticated user."""
@@ -73,9 +73,9 @@ class PrivateIngredientAPITests(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ingredient.name)
-        self.assertEqual(res.data[0]["id"], ingredient.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ingredient.name)
+        self.assertEqual(res.data["results"][0]["id"], ingredient.id)
 
     def test_update_ingredient(self):
         """Test updating a ingredient."""
@@ -89,6 +89,17 @@ class PrivateIngredientAPITests(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(ingredient.name, payload["name"])
 
+    def test_rename_ingredient_to_existing_name(self):
+        """Test renaming an ingredient to an existing name fails."""
+        create_ingredient(user=self.user, name="Coriander")
+        ingredient = create_ingredient(user=self.user, name="Parsley")
+
+        res = self.client.put(detail_url(ingredient.id), {"name": "Coriander"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, "Parsley")
+
     def test_delete_ingredient(self):
         """Test deleting a ingredient."""
         ingredient = create_ingredient(user=self.user, name="Ingredient")
@@ -116,8 +127,8 @@ class PrivateIngredientAPITests(TestCase):
 
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -140,4 +151,59 @@ class PrivateIngredientAPITests(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def _recipes_using(self, ingredient, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                title=f"Recipe {i}",
+                time_minutes=5,
+                price=Decimal("1.00"),
+                user=self.user,
+            )
+            recipe.ingredients.add(ingredient)
+
+    def test_ingredients_with_counts(self):
+        """Test listing ingredients with recipe counts in one query."""
+        salt = create_ingredient(user=self.user, name="Salt")
+        pepper = create_ingredient(user=self.user, name="Pepper")
+        create_ingredient(user=self.user, name="Basil")
+        self._recipes_using(salt, 3)
+        self._recipes_using(pepper, 1)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(INGREDIENT_URL, {"with_counts": 1})
+
+        self.assertEqual(
+            [(i["name"], i["recipe_count"]) for i in res.data["results"]],
+            [("Salt", 3), ("Pepper", 1), ("Basil", 0)],
+        )
+
+    def test_ingredients_without_counts(self):
+        """Test recipe counts are omitted unless requested."""
+        create_ingredient(user=self.user, name="Salt")
+
+        res = self.client.get(INGREDIENT_URL)
+
+        self.assertNotIn("recipe_count", res.data["results"][0])
+
+    def test_ingredients_ordered_by_usage(self):
+        """Test ordering ingredients by the number of recipes using them."""
+        salt = create_ingredient(user=self.user, name="Salt")
+        pepper = create_ingredient(user=self.user, name="Pepper")
+        basil = create_ingredient(user=self.user, name="Basil")
+        self._recipes_using(pepper, 3)
+        self._recipes_using(basil, 1)
+
+        res = self.client.get(INGREDIENT_URL, {"ordering": "usage"})
+
+        self.assertEqual(
+            [i["id"] for i in res.data["results"]],
+            [pepper.id, basil.id, salt.id],
+        )
+
+    def test_invalid_ordering(self):
+        """Test an unknown ordering is rejected."""
+        res = self.client.get(INGREDIENT_URL, {"ordering": "price"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,100 @@
+"""
+Tests for the fast read serializers.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.test import RequestFactory, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import (
+    IngredientReadSerializer,
+    IngredientSerializer,
+    RecipeDetailReadSerializer,
+    RecipeDetailSerializer,
+    RecipePayloadSerializer,
+    RecipeSerializer,
+    TagReadSerializer,
+    TagSerializer,
+)
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class ReadSerializerTests(TestCase):
+    """Test fast read serializers match the model serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123"
+        )
+        self.request = RequestFactory().get("/")
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Pad Thai",
+            time_minutes=25,
+            price=Decimal("8.50"),
+            link="http://example.com/pad-thai",
+            description="Noodles",
+        )
+        for i in range(3):
+            self.recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"Tag {i}")
+            )
+            self.recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f"Ing {i}")
+            )
+
+    def _recipe(self):
+        return Recipe.objects.prefetch_related("tags", "ingredients").get(
+            id=self.recipe.id
+        )
+
+    def test_recipe_detail_identical(self):
+        """Test the detail output is byte-identical with and without image"""
+        context = {"request": self.request}
+        for image in ("", "uploads/recipe/pad-thai.jpg"):
+            Recipe.objects.filter(id=self.recipe.id).update(
+                image=image,
+                image_renditions={"small": {"webp": "pad-thai_small.webp"}},
+                image_status=Recipe.ImageStatus.READY,
+            )
+            recipe = self._recipe()
+            self.assertEqual(
+                render(RecipeDetailReadSerializer(recipe, context=context)
+                       .data),
+                render(RecipeDetailSerializer(recipe, context=context).data),
+            )
+
+    def test_recipe_payload_identical(self):
+        """Test the stored payload matches the list serializer fields"""
+        recipe = self._recipe()
+        expected = RecipeSerializer(recipe).data
+        del expected["image_renditions"], expected["image_status"]
+
+        self.assertEqual(
+            render(RecipePayloadSerializer(recipe).data), render(expected)
+        )
+
+    def test_name_lists_identical(self):
+        """Test tag and ingredient lists are byte-identical"""
+        for model, fast, slow in (
+            (Tag, TagReadSerializer, TagSerializer),
+            (Ingredient, IngredientReadSerializer, IngredientSerializer),
+        ):
+            queryset = model.objects.annotate(recipe_count=Count("recipe"))
+            for with_counts in (False, True):
+                context = {"with_counts": with_counts}
+                self.assertEqual(
+                    render(fast(
+                        queryset.values("id", "name", "recipe_count"),
+                        many=True,
+                        context=context,
+                    ).data),
+                    render(slow(queryset, many=True, context=context).data),
+                )
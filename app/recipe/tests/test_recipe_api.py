@@ -3,25 +3,37 @@ Tests for recipe APIs
 """
 
 from decimal import Decimal
-# import tempfile
+import csv
+import io
+import json
+import shutil
+import tempfile
 # import os
 
-# from PIL import Image
+from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, RecipeListPayload, Tag, Ingredient
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import (
+    RecipeBulkSerializer,
     RecipeSerializer,
     RecipeDetailSerializer,
 )
 
 RECIPES_URL = reverse("recipe:recipe-list")
+BULK_URL = reverse("recipe:recipe-bulk")
+EXPORT_URL = reverse("recipe:recipe-export")
 
 
 def detail_url(recipe_id):
@@ -86,7 +98,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.all().order_by("-id")
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -101,7 +113,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -146,6 +158,25 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipe.title, payload["title"])
         self.assertEqual(recipe.link, original_link)
 
+    def test_update_keeps_image_fields_written_meanwhile(self):
+        """Test an update does not write back stale image fields"""
+        recipe = create_recipe(user=self.user)
+        renditions = {"small": {"webp": "uploads/recipe/a_small.webp"}}
+        Recipe.objects.filter(id=recipe.id).update(
+            image_status="ready", image_renditions=renditions
+        )
+
+        serializer = RecipeDetailSerializer(
+            recipe, data={"title": "New title"}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, "New title")
+        self.assertEqual(recipe.image_status, "ready")
+        self.assertEqual(recipe.image_renditions, renditions)
+
     def test_full_update_recipe(self):
         """Test updating a recipe with PUT"""
         recipe = create_recipe(
@@ -388,9 +419,9 @@ class PrivateRecipeAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
 
     def test_filter_recipes_by_ingredients(self):
         """Test filtering recipes by ingredients"""
@@ -409,9 +440,681 @@ class PrivateRecipeAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes uses a fixed number of queries."""
+        def create_with_relations(start, count):
+            for i in range(start, start + count):
+                recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f"Tag {i}")
+                )
+                recipe.ingredients.add(
+                    Ingredient.objects.create(user=self.user, name=f"Ing {i}")
+                )
+
+        create_with_relations(0, 2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(RECIPES_URL)
+
+        create_with_relations(2, 10)
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 12)
+        self.assertEqual(len(small), len(large))
+
+    def test_detail_query_count(self):
+        """Test retrieving a recipe loads relations in fixed queries."""
+        recipe = create_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f"T{i}"))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f"I{i}")
+            )
+
+        url = detail_url(recipe.id)
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["tags"]), 5)
+        self.assertEqual(len(res.data["ingredients"]), 5)
+
+    def test_list_recipes_paginated(self):
+        """Test listing recipes follows cursor pages."""
+        recipes = [
+            create_recipe(user=self.user, title=f"Recipe {i}")
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]],
+            [recipes[4].id, recipes[3].id],
+        )
+        self.assertIsNotNone(res.data["next"])
+
+        seen = [r["id"] for r in res.data["results"]]
+        next_url = res.data["next"]
+        while next_url:
+            res = self.client.get(next_url)
+            seen.extend(r["id"] for r in res.data["results"])
+            next_url = res.data["next"]
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+    def test_list_recipes_page_size_capped(self):
+        """Test the requested page size is capped at the maximum."""
+        max_page_size = RecipeCursorPagination.max_page_size
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                title=f"Recipe {i}",
+                time_minutes=5,
+                price=Decimal("1.00"),
+            )
+            for i in range(max_page_size + 1)
+        )
+
+        res = self.client.get(RECIPES_URL, {"page_size": max_page_size * 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), max_page_size)
+        self.assertIsNotNone(res.data["next"])
+
+    def test_create_recipe_query_count_constant(self):
+        """Test nested tags and ingredients resolve in fixed queries."""
+        def payload(count, prefix):
+            return {
+                "title": "Sample Recipe",
+                "time_minutes": 10,
+                "price": Decimal("5.25"),
+                "tags": [{"name": f"{prefix} tag {i}"} for i in range(count)],
+                "ingredients": [
+                    {"name": f"{prefix} ing {i}"} for i in range(count)
+                ],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(RECIPES_URL, payload(2, "a"), format="json")
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(
+                RECIPES_URL, payload(30, "b"), format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(len(small), len(large))
+
+    def test_create_recipe_duplicate_tag_names(self):
+        """Test repeated tag names in a payload create a single tag."""
+        payload = {
+            "title": "Sample Recipe",
+            "time_minutes": 10,
+            "price": Decimal("5.25"),
+            "tags": [{"name": "Vegan"}, {"name": "Vegan"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_update_recipe_tags_writes_only_diff(self):
+        """Test updating tags only touches added and removed rows."""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=f"Tag {i}")
+            for i in range(5)
+        ]
+        recipe.tags.add(*tags)
+
+        payload = {
+            "tags": [{"name": tag.name} for tag in tags[1:]]
+            + [{"name": "New tag"}],
+        }
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statements = [
+            query["sql"].split()[0].upper()
+            for query in ctx.captured_queries
+            if "core_recipelistpayload" not in query["sql"]
+        ]
+        self.assertEqual(statements.count("DELETE"), 1)
+        self.assertEqual(statements.count("INSERT"), 2)
+        self.assertNotIn(tags[0], recipe.tags.all())
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {tag.name for tag in tags[1:]} | {"New tag"},
+        )
+
+    def test_update_recipe_same_tags_no_writes(self):
+        """Test resubmitting the same tags issues no through writes."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe.tags.add(tag)
+
+        payload = {"tags": [{"name": "Vegan"}]}
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statements = [
+            query["sql"].split()[0].upper()
+            for query in ctx.captured_queries
+            if "core_recipelistpayload" not in query["sql"]
+        ]
+        self.assertNotIn("DELETE", statements)
+        self.assertNotIn("INSERT", statements)
+        self.assertIn(tag, recipe.tags.all())
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        """Test tag and ingredient filters are combined."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Tofu")
+        recipe1 = create_recipe(user=self.user, title="Tofu Stir Fry")
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = create_recipe(user=self.user, title="Vegan Salad")
+        recipe2.tags.add(tag)
+        recipe3 = create_recipe(user=self.user, title="Tofu Omelette")
+        recipe3.ingredients.add(ingredient)
+
+        params = {"tags": f"{tag.id}", "ingredients": f"{ingredient.id}"}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [recipe1.id]
+        )
+
+    def test_filter_recipes_match_all_tags(self):
+        """Test match=all only returns recipes with every tag."""
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Spicy")
+        recipe1 = create_recipe(user=self.user, title="Vegan Curry")
+        recipe1.tags.add(tag1, tag2)
+        recipe2 = create_recipe(user=self.user, title="Vegan Salad")
+        recipe2.tags.add(tag1)
+
+        params = {"tags": f"{tag1.id},{tag2.id}"}
+        res_any = self.client.get(RECIPES_URL, params)
+        res_all = self.client.get(RECIPES_URL, {**params, "match": "all"})
+
+        self.assertEqual(
+            [r["id"] for r in res_any.data["results"]],
+            [recipe2.id, recipe1.id],
+        )
+        self.assertEqual(
+            [r["id"] for r in res_all.data["results"]], [recipe1.id]
+        )
+
+    def test_filter_recipes_invalid_match(self):
+        """Test an unknown match value is rejected."""
+        res = self.client.get(RECIPES_URL, {"tags": "1", "match": "some"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes in one request"""
+        payload = {
+            "create": [
+                {
+                    "title": f"Recipe {i}",
+                    "time_minutes": 10,
+                    "price": "5.25",
+                    "tags": [{"name": "Vegan"}, {"name": f"Tag {i}"}],
+                    "ingredients": [{"name": "Salt"}],
+                }
+                for i in range(3)
+            ],
+        }
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in res.data["create"]]
+        recipes = Recipe.objects.filter(id__in=ids, user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        for i, recipe_id in enumerate(ids):
+            recipe = Recipe.objects.get(id=recipe_id)
+            self.assertEqual(recipe.title, f"Recipe {i}")
+            self.assertEqual(
+                set(recipe.tags.values_list("name", flat=True)),
+                {"Vegan", f"Tag {i}"},
+            )
+
+    def test_bulk_create_query_count_constant(self):
+        """Test bulk creation cost does not grow with batch size"""
+        def payload(count, prefix):
+            return {
+                "create": [
+                    {
+                        "title": f"{prefix} {i}",
+                        "time_minutes": 10,
+                        "price": "5.25",
+                        "tags": [{"name": f"{prefix} tag {i}"}],
+                    }
+                    for i in range(count)
+                ],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BULK_URL, payload(2, "a"), format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(BULK_URL, payload(20, "b"), format="json")
+
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_invalid_item_writes_nothing(self):
+        """Test one invalid item rejects the whole batch"""
+        recipe = create_recipe(user=self.user)
+        payload = {
+            "create": [
+                {"title": "Good", "time_minutes": 5, "price": "1.00"},
+                {"title": "Bad", "time_minutes": "soon", "price": "1.00"},
+            ],
+            "delete": [recipe.id],
+        }
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("time_minutes", res.data["create"][1])
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_bulk_update_and_delete(self):
+        """Test updating and deleting recipes in one request"""
+        recipe1 = create_recipe(user=self.user, title="Old title")
+        recipe2 = create_recipe(user=self.user)
+        other = create_recipe(
+            user=create_user(email="other@example.com", password="test")
+        )
+        payload = {
+            "update": [{"id": recipe1.id, "title": "New title"}],
+            "delete": [recipe2.id, other.id],
+        }
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, "New title")
+        self.assertFalse(Recipe.objects.filter(id=recipe2.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+        self.assertEqual(
+            res.data["delete"],
+            [
+                {"id": recipe2.id, "deleted": True},
+                {"id": other.id, "deleted": False},
+            ],
+        )
+
+    def test_bulk_update_tags_and_fields(self):
+        """Test updates replace tags and leave unchanged fields alone"""
+        recipe1 = create_recipe(user=self.user, title="One", time_minutes=5)
+        recipe1.tags.add(Tag.objects.create(user=self.user, name="Old"))
+        recipe2 = create_recipe(user=self.user, title="Two", time_minutes=7)
+        payload = {
+            "update": [
+                {"id": recipe1.id, "tags": [{"name": "New"}]},
+                {"id": recipe2.id, "time_minutes": 9},
+            ],
+        }
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(
+            list(recipe1.tags.values_list("name", flat=True)), ["New"]
+        )
+        self.assertEqual((recipe1.title, recipe1.time_minutes), ("One", 5))
+        self.assertEqual((recipe2.title, recipe2.time_minutes), ("Two", 9))
+
+    def test_bulk_update_query_count_constant(self):
+        """Test bulk update cost does not grow with batch size"""
+        def payload(count, prefix):
+            recipes = [create_recipe(user=self.user) for _ in range(count)]
+            return {
+                "update": [
+                    {
+                        "id": recipe.id,
+                        "title": f"{prefix} {i}",
+                        "tags": [{"name": f"{prefix} tag {i}"}],
+                    }
+                    for i, recipe in enumerate(recipes)
+                ],
+            }
+
+        small_payload, large_payload = payload(2, "a"), payload(20, "b")
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BULK_URL, small_payload, format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(BULK_URL, large_payload, format="json")
+
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_update_other_users_recipe_error(self):
+        """Test updating another user's recipe is reported as not found"""
+        other = create_recipe(
+            user=create_user(email="other@example.com", password="test")
+        )
+        payload = {"update": [{"id": other.id, "title": "Mine now"}]}
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data["update"][0])
+
+    def test_bulk_update_invalid_ids(self):
+        """Test bool and repeated update ids are rejected as invalid"""
+        recipe = create_recipe(user=self.user)
+        cases = [
+            ([{"id": True, "title": "New"}], "integer id"),
+            (
+                [{"id": recipe.id, "title": "A"},
+                 {"id": recipe.id, "title": "B"}],
+                "only once",
+            ),
+        ]
+        for update, message in cases:
+            with self.subTest(update=update):
+                res = self.client.post(
+                    BULK_URL, {"update": update}, format="json"
+                )
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(message, str(res.data["update"][0]))
+
+    def test_bulk_batch_size_limited(self):
+        """Test batches above the maximum size are rejected"""
+        payload = {"delete": list(range(RecipeBulkSerializer.max_items + 1))}
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes streams one JSON object per line"""
+        recipe = create_recipe(user=self.user, title="Curry")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Spicy"))
+        create_recipe(
+            user=create_user(email="other@example.com", password="test")
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row["title"], "Curry")
+        self.assertEqual(row["price"], "5.25")
+        self.assertEqual(row["tags"], ["Spicy"])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        recipe = create_recipe(user=self.user, title="Salad")
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Lettuce"),
+            Ingredient.objects.create(user=self.user, name="Tomato"),
+        )
+
+        res = self.client.get(EXPORT_URL, {"fmt": "csv"})
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        content = b"".join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["title"], "Salad")
+        self.assertEqual(
+            sorted(rows[0]["ingredients"].split(";")), ["Lettuce", "Tomato"]
+        )
+
+    def test_export_invalid_format(self):
+        """Test an unknown export format is rejected"""
+        res = self.client.get(EXPORT_URL, {"fmt": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """Test searching recipes by title, tags and ingredients"""
+        curry = create_recipe(user=self.user, title="Thai Green Curry")
+        stew = create_recipe(user=self.user, title="Beef Stew")
+        stew.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Carrots")
+        )
+        soup = create_recipe(user=self.user, title="Soup")
+        soup.tags.add(Tag.objects.create(user=self.user, name="Thai"))
+        create_recipe(
+            user=create_user(email="other@example.com", password="test"),
+            title="Thai Salad",
+        )
+
+        res = self.client.get(RECIPES_URL, {"search": "thai"})
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [curry.id, soup.id]
+        )
+
+        res = self.client.get(RECIPES_URL, {"search": "carrot"})
+        self.assertEqual([r["id"] for r in res.data["results"]], [stew.id])
+
+    def test_search_recipes_prefix(self):
+        """Test search matches word prefixes for every term"""
+        recipe = create_recipe(user=self.user, title="Chicken Tikka Masala")
+        create_recipe(user=self.user, title="Chicken Soup")
+
+        res = self.client.get(RECIPES_URL, {"search": "chick tik"})
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+
+    def test_search_without_words_returns_nothing(self):
+        """Test a punctuation-only search returns an empty page"""
+        create_recipe(user=self.user, title="Soup")
+
+        res = self.client.get(RECIPES_URL, {"search": "!!!"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [])
+
+    def test_search_reflects_tag_changes(self):
+        """Test renaming or unlinking a tag updates search results"""
+        recipe = create_recipe(user=self.user, title="Pancakes")
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipe.tags.add(tag)
+
+        tag.name = "Brunch"
+        tag.save()
+        res = self.client.get(RECIPES_URL, {"search": "brunch"})
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+
+        recipe.tags.remove(tag)
+        res = self.client.get(RECIPES_URL, {"search": "brunch"})
+        self.assertEqual(res.data["results"], [])
+
+    def test_search_recipes_paginated_by_rank(self):
+        """Test search results page through every match once"""
+        recipes = [
+            create_recipe(
+                user=self.user,
+                title="Pasta" if i % 2 else "Pasta Pasta",
+                description="pasta " * i,
+            )
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {"search": "pasta", "page_size": 2})
+        seen = [r["id"] for r in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            seen.extend(r["id"] for r in res.data["results"])
+
+        self.assertEqual(sorted(seen), sorted(r.id for r in recipes))
+
+    def test_list_served_from_stored_payloads(self):
+        """Test listing recipes written through the API is one query"""
+        payload = {
+            "title": "Curry",
+            "time_minutes": 30,
+            "price": "7.50",
+            "tags": [{"name": "Spicy"}],
+            "ingredients": [{"name": "Rice"}, {"name": "Chili"}],
+        }
+        for _ in range(3):
+            self.client.post(RECIPES_URL, payload, format="json")
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.order_by("-id")
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.data["results"], serializer.data)
+
+    def test_list_payload_expired_on_change(self):
+        """Test renames and link changes are reflected in the list"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+        self.assertTrue(
+            RecipeListPayload.objects.filter(recipe=recipe).exists()
+        )
+
+        tag.name = "Brunch"
+        tag.save()
+        self.assertFalse(
+            RecipeListPayload.objects.filter(recipe=recipe).exists()
+        )
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"][0]["tags"][0]["name"], "Brunch")
+
+        recipe.tags.remove(tag)
+        Recipe.objects.filter(id=recipe.id).update(title="Waffles")
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"][0]["title"], "Waffles")
+        self.assertEqual(res.data["results"][0]["tags"], [])
+
+    def test_list_sparse_fields(self):
+        """Test fields= trims the list and skips unrequested relations"""
+        recipe = create_recipe(user=self.user, title="Soup")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Warm"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {"fields": "title,id"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"], [{"id": recipe.id, "title": "Soup"}]
+        )
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn("core_tag", ctx[0]["sql"])
+        self.assertNotIn("description", ctx[0]["sql"])
+
+    def test_list_sparse_related_ids_and_expand(self):
+        """Test related fields are IDs unless expanded"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Warm")
+        ingredient = Ingredient.objects.create(user=self.user, name="Leek")
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {"fields": "id,tags"})
+        self.assertEqual(
+            res.data["results"], [{"id": recipe.id, "tags": [tag.id]}]
+        )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPES_URL, {"fields": "id", "expand": "tags,ingredients"}
+            )
+        self.assertEqual(res.data["results"], [{
+            "id": recipe.id,
+            "tags": [{"id": tag.id, "name": "Warm"}],
+            "ingredients": [{"id": ingredient.id, "name": "Leek"}],
+        }])
+
+    def test_retrieve_sparse_fields(self):
+        """Test fields= applies to the recipe detail"""
+        recipe = create_recipe(user=self.user, description="Slow cooked")
+
+        res = self.client.get(
+            detail_url(recipe.id), {"fields": "description,price"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, {"price": "5.25", "description": "Slow cooked"}
+        )
+
+    def test_sparse_fields_invalid(self):
+        """Test unknown fields and expansions are rejected"""
+        for params in (
+            {"fields": "id,secret"},
+            {"fields": "description"},
+            {"fields": ""},
+            {"fields": "id", "expand": "title"},
+        ):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageRenditionTests(TestCase):
+    """Test image uploads expose downscaled renditions"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_image_queues_renditions(self):
+        """Test uploading an image returns pending, then rendition URLs"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            img = Image.new("RGB", (1200, 800))
+            img.save(image_file, "JPEG")
+            image_file.seek(0)
+            res = self.client.post(
+                url, {"image": image_file}, format="multipart"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["image_status"], "pending")
+        self.assertEqual(res.data["image_renditions"], {})
+
+        call_command(
+            "process_images", "--once", "--concurrency", "1",
+            stdout=io.StringIO(),
+        )
+        res = self.client.get(RECIPES_URL)
+
+        recipe = res.data["results"][0]
+        self.assertEqual(recipe["image_status"], "ready")
+        self.assertEqual(
+            set(recipe["image_renditions"]), {"small", "medium"}
+        )
+        self.assertTrue(
+            recipe["image_renditions"]["small"]["webp"].startswith(
+                "http://testserver/"
+            )
+        )
 
 
 # class ImageUploadTests(TestCase):
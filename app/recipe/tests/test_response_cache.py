@@ -0,0 +1,120 @@
+"""
+Tests for per-user list response caching.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def create_user(email="user@example.com", password="test123"):
+    """Create a user with email and password."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        "title": "Sample Recipe",
+        "time_minutes": 10,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RESPONSE_CACHE={"ALIAS": "default", "TTL": 60})
+class ResponseCacheTests(TestCase):
+    """Test list responses are cached and invalidated per user."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request runs no recipe queries."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIn("ETag", res)
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test a matching ETag returns 304."""
+        res = self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_params_are_normalized(self):
+        """Test parameter order does not change the cache entry."""
+        res1 = self.client.get(RECIPES_URL, {"tags": "1", "match": "all"})
+        res2 = self.client.get(f"{RECIPES_URL}?match=all&tags=1")
+
+        self.assertEqual(res1["ETag"], res2["ETag"])
+
+    def test_create_invalidates_list(self):
+        """Test creating a recipe invalidates cached lists."""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        payload = {
+            "title": "New Recipe",
+            "time_minutes": 5,
+            "price": Decimal("1.00"),
+            "tags": [{"name": "Vegan"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, payload, format="json")
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        tags = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(len(tags.data["results"]), 1)
+
+    def test_update_and_delete_invalidate_list(self):
+        """Test updating and deleting through the API invalidate lists."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(TAGS_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse("recipe:tag-detail", args=[tag.id]),
+                {"name": "Vegetarian"},
+            )
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data["results"][0]["name"], "Vegetarian")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("recipe:tag-detail", args=[tag.id]))
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data["results"], [])
+
+    def test_cache_is_per_user(self):
+        """Test cached lists are not shared between users."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        other = create_user(email="other@example.com")
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data["results"], [])
@@ -11,6 +11,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
+from recipe.pagination import RecipeAttrCursorPagination
 from recipe.serializers import TagSerializer
 
 TAG_URL = reverse("recipe:tag-list")
@@ -65,7 +66,7 @@ class PrivateTagApiTests(TestCase):
         tags = Tag.objects.all().order_by("-name")
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self):
         user2 = create_user(email="user2@example.com", password="test123")
@@ -75,8 +76,8 @@ class PrivateTagApiTests(TestCase):
         res = self.client.get(TAG_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tag.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], tag.name)
 
     def test_update_tag(self):
         """Test updating a tag."""
@@ -90,6 +91,27 @@ class PrivateTagApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload["name"])
 
+    def test_rename_tag_to_existing_name(self):
+        """Test renaming a tag to another of the user's tags fails."""
+        create_tag(user=self.user, name="Brunch")
+        tag = create_tag(user=self.user, name="Breakfast")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "Brunch"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Breakfast")
+
+    def test_rename_tag_to_other_users_name(self):
+        """Test a name used by another user does not block a rename."""
+        other = create_user(email="other@example.com")
+        create_tag(user=other, name="Brunch")
+        tag = create_tag(user=self.user, name="Breakfast")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "Brunch"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = create_tag(user=self.user, name="Lunch")
@@ -117,8 +139,8 @@ class PrivateTagApiTests(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -141,4 +163,69 @@ class PrivateTagApiTests(TestCase):
 
         res = self.client.get(TAG_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_list_tags_paginated(self):
+        """Test listing tags follows cursor pages by name."""
+        for name in ["Alpha", "Bravo", "Charlie"]:
+            create_tag(user=self.user, name=name)
+
+        res = self.client.get(TAG_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t["name"] for t in res.data["results"]],
+            ["Charlie", "Bravo"],
+        )
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [t["name"] for t in res.data["results"]],
+            ["Alpha"],
+        )
+        self.assertIsNone(res.data["next"])
+
+    def test_typeahead_tags(self):
+        """Test q returns prefix matches first, then similar names."""
+        create_tag(user=self.user, name="Dinner")
+        create_tag(user=self.user, name="Dessert")
+        create_tag(user=self.user, name="Breakfast")
+        other = create_user(email="other@example.com")
+        create_tag(user=other, name="Desserts")
+
+        res = self.client.get(TAG_URL, {"q": "des"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t["name"] for t in res.data["results"]], ["Dessert"]
+        )
+
+    def test_typeahead_tags_fuzzy(self):
+        """Test q tolerates typos through trigram similarity."""
+        create_tag(user=self.user, name="Vegetarian")
+        create_tag(user=self.user, name="Vegan")
+        create_tag(user=self.user, name="Lunch")
+
+        res = self.client.get(TAG_URL, {"q": "vegatarian"})
+
+        names = [t["name"] for t in res.data["results"]]
+        self.assertEqual(names[0], "Vegetarian")
+        self.assertNotIn("Lunch", names)
+
+    def test_typeahead_tags_capped(self):
+        """Test typeahead returns a capped number of suggestions."""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f"Spicy {i}") for i in range(60)
+        )
+        pagination = RecipeAttrCursorPagination
+
+        res = self.client.get(TAG_URL, {"q": "spi"})
+        self.assertEqual(
+            len(res.data["results"]), pagination.typeahead_page_size
+        )
+
+        res = self.client.get(TAG_URL, {"q": "spi", "page_size": 500})
+        self.assertEqual(
+            len(res.data["results"]), pagination.typeahead_max_page_size
+        )
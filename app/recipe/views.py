@@ -2,6 +2,30 @@
 Views for the recipe app.
 """
 
+import re
+
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -14,23 +38,57 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    RecipeDetailReadSerializer,
     TagSerializer,
+    TagReadSerializer,
     IngredientSerializer,
+    IngredientReadSerializer,
     RecipeImageSerializer,
+    RecipeBulkSerializer,
+    RecipeSparseSerializer,
+    StoredRecipeSerializer,
+    fill_list_payloads,
 )
+from recipe.async_views import AsyncReadMixin
+from recipe.cache import ResponseCacheMixin
+from recipe.export import EXPORT_FORMATS, aiter_sync
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+
+RELATED_FIELDS = {"tags": Tag, "ingredients": Ingredient}
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description="Comma-separated list of fields to return; tags and "
+        "ingredients are returned as IDs unless expanded",
+    ),
+    OpenApiParameter(
+        "expand",
+        OpenApiTypes.STR, enum=list(RELATED_FIELDS),
+        many=True, explode=False,
+        description="Comma-separated list of related fields to return "
+        "as objects when fields is given",
+    ),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
         parameters=[
+            *SPARSE_PARAMETERS,
             OpenApiParameter(
                 "tags",
                 OpenApiTypes.STR,
@@ -41,48 +99,181 @@ from recipe.serializers import (
                 OpenApiTypes.STR,
                 description="Comma-separated list of ingredient IDs to filter",
             ),
-        ]
-    )
+            OpenApiParameter(
+                "search",
+                OpenApiTypes.STR,
+                description="Full-text search over title, description, "
+                "tag and ingredient names, ranked by relevance",
+            ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR, enum=["any", "all"],
+                description="Match recipes with any (default) or all "
+                "of the given tag and ingredient IDs",
+            ),
+        ],
+        responses=RecipeSerializer(many=True),
+    ),
+    retrieve=extend_schema(parameters=SPARSE_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ResponseCacheMixin, AsyncReadMixin, viewsets.ModelViewSet
+):
     """Manage recipes in the database"""
 
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    def _filter_related(self, queryset, field_name, ids, match):
+        """Filter recipes linked to any or all of the given related ids"""
+        field = Recipe._meta.get_field(field_name)
+        links = field.remote_field.through.objects.filter(
+            **{field.m2m_column_name(): OuterRef("pk")}
+        )
+        lookup = field.m2m_reverse_name()
+        if match == "all":
+            for pk in set(ids):
+                queryset = queryset.filter(
+                    Exists(links.filter(**{lookup: pk}))
+                )
+            return queryset
+        return queryset.filter(
+            Exists(links.filter(**{f"{lookup}__in": ids}))
+        )
+
+    def _sparse_fields(self):
+        """Return the requested (fields, expand), or None for all fields"""
+        params = self.request.query_params
+        if self.action not in ("list", "retrieve") or "fields" not in params:
+            return None
+        serializer = (
+            RecipeSerializer if self.action == "list"
+            else RecipeDetailSerializer
+        )
+        expand = {name for name in params.get("expand", "").split(",") if name}
+        if expand - set(RELATED_FIELDS):
+            raise ValidationError(
+                {"expand": f"Must be one of {', '.join(RELATED_FIELDS)}."}
+            )
+        requested = {
+            name for name in params["fields"].split(",") if name
+        } | expand
+        unknown = requested - set(serializer.Meta.fields)
+        if unknown or not requested:
+            raise ValidationError(
+                {"fields": f"Must be one or more of "
+                 f"{', '.join(serializer.Meta.fields)}."}
+            )
+        fields = [name for name in serializer.Meta.fields if name in requested]
+        return fields, expand
+
+    def _sparse_queryset(self, queryset, fields, expand):
+        """Load only the columns and relations of the requested fields"""
+        columns = {"id"}
+        for name in fields:
+            model = RELATED_FIELDS.get(name)
+            if model is None:
+                columns.add(name)
+                continue
+            related = model.objects.only(
+                "id", *(["name"] if name in expand else [])
+            )
+            queryset = queryset.prefetch_related(
+                Prefetch(name, queryset=related)
+            )
+        return queryset.only(*columns)
+
+    def _search(self, queryset, text):
+        """Filter recipes matching every word as a prefix, ranked"""
+        words = re.findall(r"\w+", text)
+        if not words:
+            # Still annotated, as search results are ordered by rank.
+            return queryset.none().annotate(
+                rank=Value(0.0, output_field=FloatField())
+            )
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            config="english",
+            search_type="raw",
+        )
+        # ts_rank returns real; as double precision the value survives
+        # the round trip through the pagination cursor unchanged.
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
+        search = self.request.query_params.get("search")
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
+        match = self.request.query_params.get("match", "any")
+        if match not in ("any", "all"):
+            raise ValidationError({"match": "Must be 'any' or 'all'."})
+        queryset = self.queryset.filter(user=self.request.user)
+        if search:
+            queryset = self._search(queryset, search)
         if tags:
             tags_ids = self._params_to_ints(tags)
-            queryset = self.queryset.filter(tags__id__in=tags_ids)
+            queryset = self._filter_related(
+                queryset, "tags", tags_ids, match
+            )
         if ingredients:
             ingredients_ids = self._params_to_ints(ingredients)
-            queryset = self.queryset.filter(
-                ingredients__id__in=ingredients_ids)
-        return queryset.filter(
-            user=self.request.user
-            ).order_by("-id").distinct()
+            queryset = self._filter_related(
+                queryset, "ingredients", ingredients_ids, match
+            )
+        ordering = ("-rank", "-id") if search else ("-id",)
+        queryset = queryset.order_by(*ordering)
+        sparse = self._sparse_fields()
+        if sparse:
+            return self._sparse_queryset(queryset, *sparse)
+        if self.action == "list":
+            # Rendered from stored payloads, see StoredRecipeSerializer.
+            return queryset.select_related("list_payload").only(
+                "id", "image_renditions", "image_status",
+                "list_payload__payload",
+            )
+        return queryset.prefetch_related("tags", "ingredients")
 
     def get_serializer_class(self):
         """Return the appropriate serializer class based on action"""
-        if self.action == "list":
-            return RecipeSerializer
+        if self._sparse_fields():
+            return RecipeSparseSerializer
+        elif self.action == "list":
+            return StoredRecipeSerializer
+        elif self.action == "retrieve":
+            return RecipeDetailReadSerializer
         elif self.action == "upload_image":
             return RecipeImageSerializer
+        elif self.action == "bulk":
+            return RecipeBulkSerializer
         return self.serializer_class
 
+    async def aprepare_page(self, page):
+        """Render missing list payloads before serializing the page"""
+        if self.get_serializer_class() is StoredRecipeSerializer:
+            await sync_to_async(fill_list_payloads)(page)
+
+    def get_serializer_context(self):
+        """Pass the requested fields to RecipeSparseSerializer"""
+        context = super().get_serializer_context()
+        sparse = self._sparse_fields()
+        if sparse:
+            context["fields"], context["expand"] = sparse
+        return context
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
+        self.invalidate_cache()
 
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
@@ -91,9 +282,102 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            self.invalidate_cache()
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "fmt",
+                OpenApiTypes.STR, enum=list(EXPORT_FORMATS),
+                description="Export format, ndjson (default) or csv",
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or CSV"""
+        fmt = request.query_params.get("fmt", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"fmt": f"Must be one of {', '.join(EXPORT_FORMATS)}."}
+            )
+        stream, content_type = EXPORT_FORMATS[fmt]
+        content = stream(self.get_queryset())
+        if settings.ASYNC_API:
+            content = aiter_sync(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{fmt}"'
+        )
+        return response
+
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create, update and delete recipes in a single transaction"""
+        batch = self.get_serializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        context = self.get_serializer_context()
+        update_items = batch.validated_data["update"]
+        delete_ids = batch.validated_data["delete"]
+
+        creates = RecipeDetailSerializer(
+            data=batch.validated_data["create"], many=True, context=context
+        )
+        instances = Recipe.objects.filter(user=request.user).in_bulk(
+            [item["id"] for item in update_items]
+        )
+        updates = [
+            RecipeDetailSerializer(
+                instances.get(item["id"]),
+                data=item,
+                partial=True,
+                context=context,
+            )
+            for item in update_items
+        ]
+
+        errors = {}
+        if not creates.is_valid():
+            errors["create"] = creates.errors
+        update_errors = []
+        for serializer in updates:
+            if serializer.instance is None:
+                update_errors.append({"id": ["Not found."]})
+            elif not serializer.is_valid():
+                update_errors.append(serializer.errors)
+            else:
+                update_errors.append({})
+        if any(update_errors):
+            errors["update"] = update_errors
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            created = creates.save(user=request.user)
+            if updates:
+                RecipeDetailSerializer(many=True, context=context).update(
+                    [serializer.instance for serializer in updates],
+                    [serializer.validated_data for serializer in updates],
+                )
+            owned = Recipe.objects.filter(user=request.user, id__in=delete_ids)
+            deleted = set(owned.values_list("id", flat=True))
+            owned.delete()
+        self.invalidate_cache()
+
+        return Response(
+            {
+                "create": [{"id": recipe.id} for recipe in created],
+                "update": [{"id": s.instance.id} for s in updates],
+                "delete": [
+                    {"id": pk, "deleted": pk in deleted} for pk in delete_ids
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -103,10 +387,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description="Filter by items assigned to recipes",
             ),
+            OpenApiParameter(
+                "q",
+                OpenApiTypes.STR,
+                description="Typeahead: names starting with or similar "
+                "to the text, best matches first",
+            ),
+            OpenApiParameter(
+                "with_counts",
+                OpenApiTypes.INT, enum=[0, 1],
+                description="Include the number of recipes using each item",
+            ),
+            OpenApiParameter(
+                "ordering",
+                OpenApiTypes.STR, enum=["name", "usage"],
+                description="Order by name (default) or by recipe count",
+            ),
         ]
     )
 )
 class BaseRecipeAttrViewSet(
+    ResponseCacheMixin,
+    AsyncReadMixin,
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -114,26 +416,82 @@ class BaseRecipeAttrViewSet(
 ):
     """Base viewset for recipe attributes"""
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
+
+    def _typeahead(self, queryset, text):
+        """Filter names by prefix or trigram similarity, ranked"""
+        prefix = Q(name__iregex=f"^{re.escape(text)}")
+        return queryset.filter(
+            prefix
+            | Q(name__trigram_word_similar=text)
+            | Q(name__trigram_similar=text)
+        ).annotate(
+            rank=Cast(
+                Case(When(prefix, then=Value(1.0)), default=Value(0.0))
+                + TrigramWordSimilarity(text, "name"),
+                FloatField(),
+            )
+        )
+
+    def _with_counts(self):
+        return bool(int(self.request.query_params.get("with_counts", 0)))
+
+    def _order_by_usage(self):
+        ordering = self.request.query_params.get("ordering", "name")
+        if ordering not in ("name", "usage"):
+            raise ValidationError({"ordering": "Must be 'name' or 'usage'."})
+        return ordering == "usage"
 
     def get_queryset(self):
         """Retrieve the objects for the authenticated user"""
         assigned_only = bool(
             int(self.request.query_params.get("assigned_only", 0))
             )
-        queryset = self.queryset
+        q = self.request.query_params.get("q", "").strip()
+        by_usage = self._order_by_usage()
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(
-            user=self.request.user
-            ).order_by("-name").distinct()
+            model = self.queryset.model
+            links = model.recipe_set.through.objects.filter(
+                **{f"{model._meta.model_name}_id": OuterRef("pk")}
+            )
+            queryset = queryset.filter(Exists(links))
+        if q:
+            queryset = self._typeahead(queryset, q)
+        if self._with_counts() or by_usage:
+            queryset = queryset.annotate(recipe_count=Count("recipe"))
+        if q:
+            ordering = ("-rank", "-id")
+        elif by_usage:
+            ordering = ("-recipe_count", "-id")
+        else:
+            ordering = ("-name",)
+        queryset = queryset.order_by(*ordering)
+        if self.action == "list":
+            # Plain rows for read_serializer_class, see NameReadMixin.
+            return queryset.values("id", "name", *queryset.query.annotations)
+        return queryset
+
+    def get_serializer_class(self):
+        """Use the fast read serializer for lists"""
+        if self.action == "list":
+            return self.read_serializer_class
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        """Tell the serializer whether recipe counts were requested"""
+        context = super().get_serializer_context()
+        context["with_counts"] = self._with_counts()
+        return context
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
 
     serializer_class = TagSerializer
+    read_serializer_class = TagReadSerializer
     queryset = Tag.objects.all()
 
 
@@ -141,4 +499,5 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
 
     serializer_class = IngredientSerializer
+    read_serializer_class = IngredientReadSerializer
     queryset = Ingredient.objects.all()
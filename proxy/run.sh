@@ -2,5 +2,13 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;' 
+# The app speaks uwsgi in wsgi mode and HTTP in asgi mode.
+if [ "${RUN_MODE:-wsgi}" = "asgi" ]; then
+    TEMPLATE=/etc/nginx/asgi.conf.tpl
+else
+    TEMPLATE=/etc/nginx/default.conf.tpl
+fi
+
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' \
+    < "$TEMPLATE" > /etc/nginx/conf.d/default.conf
+nginx -g 'daemon off;'
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Closed-loop HTTP load test for the recipe API.
+
+Keeps a fixed number of keep-alive connections busy for a while and
+reports throughput, latency percentiles and, when given the server's
+master process id, the memory of the whole process tree. Memory is the
+proportional set size, so pages forked workers share are counted once.
+
+To compare RUN_MODEs, give each the worker count that keeps its peak
+within the same --budget, then raise --concurrency until requests fail
+or latency is unacceptable. The script must see the server's /proc, so
+run it on the same host; in a deployment, run it in the app container,
+where the server runs under process 1, against the proxy:
+
+    python /scripts/loadtest.py http://proxy:8000 --token KEY \\
+        --pid 1 --budget 256 --concurrency 64 \\
+        --path /api/recipe/recipes/ --path /api/recipe/recipes/export/
+
+It exits with status 1 when the peak goes over the budget. Only the
+standard library is used, so it runs anywhere Python does.
+
+On a single core shared with this script, over the recipe list, tags
+and export paths for 15 s, a 256 MiB budget fits 6 uwsgi workers or 2
+uvicorn workers with DB_POOL=1:
+
+    connections  uwsgi                      uvicorn
+    16           69.9 req/s, p99 0.6 s      52.5 req/s, p99 1.0 s
+    64           77.0 req/s, p99 2.2 s      54.8 req/s, p99 4.3 s
+    256          104.8 req/s, p99 9.4 s     68.3 req/s, p99 10.9 s,
+                                            38 pool timeouts
+
+uvicorn serves about 25-35% fewer requests at each concurrency. Both
+hold 64 connections without errors. At 256, uwsgi queues the excess
+requests in its listen backlog. uvicorn accepts them all and fails the
+ones that wait longer than DB_POOL_TIMEOUT for a connection; without
+the pool, it exceeds Postgres' max_connections instead.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+def process_memory(pid):
+    """Return the proportional set size in bytes of a process.
+
+    Falls back to the resident set size where smaps_rollup is missing.
+    """
+    for path, field in (
+        (f"/proc/{pid}/smaps_rollup", "Pss:"),
+        (f"/proc/{pid}/status", "VmRSS:"),
+    ):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return 0
+
+
+def tree_memory(pid):
+    """Return the memory in bytes of pid and its descendants."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        total += process_memory(current)
+    return total
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response.
+
+    Returns the status code and whether the connection can be reused.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length = None
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+        elif name == "connection" and "close" in value.lower():
+            keep_alive = False
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    elif status not in (204, 304):
+        # No framing: the body ends when the server closes.
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+async def client(target, paths, headers, deadline, results):
+    """Send requests over one connection until the deadline."""
+    reader, writer = None, None
+    index = 0
+    try:
+        while time.monotonic() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    target.hostname, target.port or 80
+                )
+            path = paths[index % len(paths)]
+            index += 1
+            request = (
+                f"GET {path} HTTP/1.1\r\nHost: {target.netloc}\r\n"
+                f"{headers}\r\n"
+            )
+            start = time.perf_counter()
+            writer.write(request.encode())
+            await writer.drain()
+            try:
+                status, keep_alive = await read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                results["errors"] += 1
+                keep_alive = False
+            else:
+                results["latencies"].append(time.perf_counter() - start)
+                if status >= 400:
+                    results["errors"] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def sample_memory(pid, deadline, samples):
+    """Record the server tree's memory every half second."""
+    while time.monotonic() < deadline:
+        samples.append(tree_memory(pid))
+        await asyncio.sleep(0.5)
+
+
+async def run(args):
+    target = urlsplit(args.url)
+    headers = "Connection: keep-alive\r\n"
+    if args.token:
+        headers += f"Authorization: Token {args.token}\r\n"
+    results = {"latencies": [], "errors": 0}
+    samples = []
+    deadline = time.monotonic() + args.duration
+    tasks = [
+        client(target, args.path, headers, deadline, results)
+        for _ in range(args.concurrency)
+    ]
+    if args.pid:
+        tasks.append(sample_memory(args.pid, deadline, samples))
+    await asyncio.gather(*tasks)
+    return results, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("url", help="Base URL, e.g. http://localhost:8000")
+    parser.add_argument(
+        "--path", action="append",
+        help="Path to request, repeat to rotate between several.",
+    )
+    parser.add_argument("--token", help="API token for Authorization.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument(
+        "--pid", type=int,
+        help="Server master process id whose memory is sampled.",
+    )
+    parser.add_argument(
+        "--budget", type=float, metavar="MIB",
+        help="Memory budget the server's peak must stay within.",
+    )
+    args = parser.parse_args()
+    args.path = args.path or ["/api/recipe/recipes/"]
+
+    results, samples = asyncio.run(run(args))
+    latencies = sorted(results["latencies"])
+    if not latencies:
+        raise SystemExit("No request completed.")
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"concurrency {args.concurrency}, {args.duration:.0f}s")
+    print(
+        f"requests {len(latencies)}, errors {results['errors']}, "
+        f"{len(latencies) / args.duration:.1f} req/s"
+    )
+    print(
+        f"latency p50 {quantiles[49] * 1000:.1f} ms, "
+        f"p95 {quantiles[94] * 1000:.1f} ms, "
+        f"p99 {quantiles[98] * 1000:.1f} ms"
+    )
+    if samples and max(samples):
+        peak = max(samples) / 2 ** 20
+        if args.budget is None:
+            print(f"server memory peak {peak:.0f} MiB")
+        else:
+            print(
+                f"server memory peak {peak:.0f} MiB "
+                f"of a {args.budget:.0f} MiB budget"
+            )
+            if peak > args.budget:
+                sys.exit("Over the memory budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,16 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+if [ "${RUN_MODE:-wsgi}" = "asgi" ]; then
+    # Async views serve reads, see app/settings.py ASYNC_API.
+    # Port 9000 is only reachable on the compose network, through the
+    # proxy, whose address is not fixed, so its forwarded headers are
+    # trusted from any peer unless FORWARDED_ALLOW_IPS narrows it.
+    uvicorn app.asgi:application --host 0.0.0.0 --port 9000 \
+        --workers "${ASGI_WORKERS:-2}" --proxy-headers \
+        --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-*}"
+else
+    # Sized from the container's limits, see the uwsgi_config command.
+    # UWSGI_THREADS also sizes the database pool, see app/settings.py.
+    uwsgi --ini "exec://python manage.py uwsgi_config"
+fi